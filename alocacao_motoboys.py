@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alocação de Motoboys por Demanda
+================================
+
+Distribui os motoboys disponíveis (resultado de DataProcessor.obter_motoboys_disponiveis)
+entre as demandas de cada dia por bairro, preferindo motoboys do mesmo bairro ou de
+bairros próximos e espalhando a carga entre eles ao longo do período.
+
+A proximidade entre bairros é medida pelo prefixo de CEP em comum. Como essa distância
+forma uma hierarquia (árvore de prefixos), o fluxo de custo mínimo é obtido casando
+oferta e demanda de baixo para cima na árvore: primeiro dentro do bairro, depois no
+mesmo CEP de 5 dígitos, 4 dígitos, e assim por diante. Cada nível é resolvido em
+O(n log n), o que permite alocar milhares de motoboys em um mês inteiro em segundos.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from datas_planilha import converter_coluna_data
+
+logger = logging.getLogger(__name__)
+
+# Profundidade na árvore de prefixos: 0 = raiz, 1-5 = dígitos do CEP, 6 = bairro
+PROFUNDIDADE_BAIRRO = 6
+
+PROXIMIDADE = {
+    6: 'mesmo bairro',
+    5: 'CEP próximo (5 dígitos)',
+    4: 'CEP próximo (4 dígitos)',
+    3: 'CEP próximo (3 dígitos)',
+    2: 'mesma região (2 dígitos)',
+    1: 'mesma região (1 dígito)',
+    0: 'outra região',
+}
+
+def normalizar_cep(cep, prefixo: bool = False) -> str:
+    """Normaliza um CEP para texto com 8 dígitos ('' quando não há dígitos)
+    
+    O Excel guarda como número um CEP digitado sem hífen, perdendo o zero à esquerda
+    (01310-100 vira 1310100, ou 1310100.0 se a coluna tiver células vazias); por isso
+    o CEP é completado com zeros à esquerda. Com 'prefixo', um texto de até 5 dígitos
+    é tratado como o início de um CEP (ex.: '01310' digitado na busca) e completado
+    à direita.
+    """
+    if cep is None or isinstance(cep, bool) or pd.isna(cep):
+        return ''
+    digitos = re.sub(r'\D', '', re.sub(r'\.0+$', '', str(cep).strip()))[:8]
+    if not digitos:
+        return ''
+    if prefixo and isinstance(cep, str) and len(digitos) <= 5:
+        return digitos.ljust(8, '0')
+    return digitos.zfill(8)
+
+class AlocadorMotoboys:
+    """Alocador de motoboys disponíveis conforme a demanda por data e bairro"""
+    
+    def __init__(self, config):
+        self.config = config
+    
+    def carregar_demanda(self, demanda_path: str = None) -> pd.DataFrame:
+        """Carrega a tabela de demanda (data, bairro, quantidade de motoboys)"""
+        if not demanda_path:
+            demanda_path = self.config.get('alocacao.arquivo_demanda')
+        if not demanda_path or not os.path.exists(demanda_path):
+            raise FileNotFoundError(f"Arquivo de demanda não encontrado: {demanda_path}")
+        
+        logger.info(f"Carregando arquivo de demanda: {demanda_path}")
+        if demanda_path.lower().endswith('.csv'):
+            demanda = pd.read_csv(demanda_path, sep=None, engine='python')
+        else:
+            demanda = pd.read_excel(demanda_path)
+        
+        demanda.columns = demanda.columns.astype(str).str.strip().str.lower()
+        coluna_quantidade = next(
+            (col for col in demanda.columns
+             if any(palavra in col for palavra in ['quantidade', 'necessarios', 'necessários', 'motoboys'])),
+            None
+        )
+        faltando = [col for col, achada in (('data', 'data' in demanda.columns),
+                                            ('bairro', 'bairro' in demanda.columns),
+                                            ('quantidade', coluna_quantidade)) if not achada]
+        if faltando:
+            raise ValueError(f"Colunas não encontradas na planilha de demanda: {', '.join(faltando)}")
+        
+        datas = converter_coluna_data(demanda['data'], descricao='linhas de demanda').dt.normalize()
+        quantidades = pd.to_numeric(demanda[coluna_quantidade], errors='coerce').fillna(0).astype(int)
+        resultado = pd.DataFrame({
+            'data': datas.dt.strftime('%d/%m/%Y'),
+            'bairro': demanda['bairro'].astype(str).str.strip(),
+            'quantidade': quantidades,
+        })
+        if 'cep' in demanda.columns:
+            resultado['cep'] = demanda['cep']
+        
+        invalidas = datas.isna() | (quantidades <= 0)
+        if invalidas.any():
+            logger.warning(f"{int(invalidas.sum())} linhas de demanda sem data válida ou quantidade ignoradas")
+        
+        resultado = resultado[~invalidas]
+        logger.info(f"Demanda carregada: {int(resultado['quantidade'].sum())} motoboys em {len(resultado)} linhas")
+        return resultado
+    
+    def alocar(self, disponiveis_por_data: Dict[str, pd.DataFrame], demanda: pd.DataFrame,
+               cadastro: pd.DataFrame = None) -> Dict[str, pd.DataFrame]:
+        """Aloca os motoboys disponíveis à demanda de cada data
+        
+        'cadastro' (opcional, o cadastro completo) é usado para localizar os bairros
+        pelo CEP mais comum dos motoboys que moram neles; sem ele, usa-se apenas os
+        disponíveis. Retorna, por data, uma linha por vaga de demanda com o motoboy
+        alocado ou sem motoboy, se faltarem disponíveis.
+        """
+        referencia = cadastro if cadastro is not None else pd.concat(list(disponiveis_por_data.values()) or [pd.DataFrame()])
+        if 'bairro' not in referencia.columns:
+            raise ValueError("A alocação requer a coluna 'bairro' no cadastro (planilha.colunas_cadastro)")
+        cep_por_bairro = self._cep_por_bairro(referencia)
+        
+        # Carga acumulada no período, para espalhar as alocações entre os motoboys
+        alocacoes = defaultdict(int)
+        escala_por_data = {}
+        faltantes = 0
+        
+        datas = sorted(demanda['data'].unique(), key=lambda data_str: pd.to_datetime(data_str, format='%d/%m/%Y'))
+        for data_str in datas:
+            demanda_dia = demanda[demanda['data'] == data_str]
+            disponiveis = disponiveis_por_data.get(data_str, pd.DataFrame(columns=referencia.columns))
+            escala = self._alocar_dia(disponiveis, demanda_dia, cep_por_bairro, alocacoes)
+            faltantes += int(escala['nome'].isna().sum())
+            escala_por_data[data_str] = escala
+        
+        if faltantes:
+            logger.warning(f"Demanda não atendida: faltaram {faltantes} motoboys no período")
+        logger.info(f"Alocação concluída para {len(escala_por_data)} datas")
+        return escala_por_data
+    
+    def _alocar_dia(self, disponiveis: pd.DataFrame, demanda_dia: pd.DataFrame,
+                    cep_por_bairro: Dict[str, str], alocacoes: Dict[str, int]) -> pd.DataFrame:
+        """Casa oferta e demanda de um dia, de baixo para cima na árvore de prefixos"""
+        # Oferta e demanda nas folhas da árvore
+        oferta = defaultdict(list)
+        for posicao, (bairro, cep) in enumerate(zip(disponiveis.get('bairro', []),
+                                                    disponiveis.get('cep', [None] * len(disponiveis)))):
+            oferta[self._caminho(bairro, cep, cep_por_bairro)].append(posicao)
+        
+        procura = defaultdict(list)
+        for linha in demanda_dia.itertuples(index=False):
+            caminho = self._caminho(linha.bairro, getattr(linha, 'cep', None), cep_por_bairro)
+            procura[caminho].extend([linha.bairro] * int(linha.quantidade))
+        
+        nomes = disponiveis['nome'].tolist() if 'nome' in disponiveis.columns else []
+        pedidos = (disponiveis['pedidos_no_dia'].tolist() if 'pedidos_no_dia' in disponiveis.columns
+                   else [0] * len(nomes))
+        
+        vagas = []  # (bairro da demanda, posição do motoboy ou None, profundidade)
+        for profundidade in range(PROFUNDIDADE_BAIRRO, -1, -1):
+            oferta_nivel, procura_nivel = defaultdict(list), defaultdict(list)
+            for caminho, posicoes in oferta.items():
+                oferta_nivel[caminho[:profundidade]].extend(posicoes)
+            for caminho, bairros in procura.items():
+                procura_nivel[caminho[:profundidade]].extend(bairros)
+            
+            for no, bairros in procura_nivel.items():
+                posicoes = oferta_nivel.get(no, [])
+                quantidade = min(len(posicoes), len(bairros))
+                if quantidade:
+                    # Os menos carregados primeiro: alocações no período, pedidos no dia, nome
+                    posicoes.sort(key=lambda p: (alocacoes[nomes[p]], pedidos[p], str(nomes[p])))
+                    for bairro, posicao in zip(bairros[:quantidade], posicoes[:quantidade]):
+                        vagas.append((bairro, posicao, profundidade))
+                        alocacoes[nomes[posicao]] += 1
+                    del posicoes[:quantidade]
+                    del bairros[:quantidade]
+            
+            # O que sobrou sobe para o nível de cima
+            oferta = {no: posicoes for no, posicoes in oferta_nivel.items() if posicoes}
+            procura = {no: bairros for no, bairros in procura_nivel.items() if bairros}
+        
+        # Demanda que sobrou na raiz não tem motoboy disponível
+        for bairros in procura.values():
+            vagas.extend((bairro, None, None) for bairro in bairros)
+        
+        return self._montar_escala(disponiveis, vagas)
+    
+    def _montar_escala(self, disponiveis: pd.DataFrame, vagas: List[Tuple[str, Optional[int], Optional[int]]]) -> pd.DataFrame:
+        """Monta a tabela da escala: uma linha por vaga de demanda"""
+        colunas = [col for col in disponiveis.columns if col != 'pedidos_no_dia']
+        alocadas = [(bairro, posicao, prof) for bairro, posicao, prof in vagas if posicao is not None]
+        
+        escala = disponiveis.iloc[[posicao for _, posicao, _ in alocadas]][colunas].reset_index(drop=True)
+        escala.insert(0, 'bairro_demanda', [bairro for bairro, _, _ in alocadas])
+        escala['proximidade'] = [PROXIMIDADE[prof] for _, _, prof in alocadas]
+        
+        sem_motoboy = [bairro for bairro, posicao, _ in vagas if posicao is None]
+        if sem_motoboy:
+            faltas = pd.DataFrame({'bairro_demanda': sem_motoboy, 'proximidade': 'sem motoboy disponível'})
+            # Inteiros e booleanos em tipos com valor vazio, para não virarem float/object com as linhas sem motoboy
+            anulaveis = {col: 'Int64' for col in escala.select_dtypes('integer').columns}
+            anulaveis.update({col: 'boolean' for col in escala.select_dtypes('bool').columns})
+            escala = escala.astype(anulaveis)
+            faltas = faltas.reindex(columns=escala.columns).astype(escala.dtypes.to_dict())
+            escala = pd.concat([escala, faltas], ignore_index=True)
+        
+        # Ordenação estável: dentro de cada bairro, os mais próximos aparecem primeiro
+        return escala.sort_values('bairro_demanda', kind='stable', ignore_index=True)
+    
+    def _cep_por_bairro(self, cadastro: pd.DataFrame) -> Dict[str, str]:
+        """CEP (apenas dígitos) mais comum entre os motoboys de cada bairro"""
+        if 'cep' not in cadastro.columns or cadastro.empty:
+            return {}
+        ceps = cadastro['cep'].astype(object).map(normalizar_cep).str[:5]
+        bairros = cadastro['bairro'].map(self._normalizar_bairro)
+        validos = (ceps.str.len() > 0) & (bairros != '')
+        frequencia = pd.DataFrame({'bairro': bairros[validos], 'cep': ceps[validos]}).value_counts()
+        # value_counts já vem em ordem decrescente: o primeiro CEP de cada bairro é o mais comum
+        return {bairro: cep for bairro, cep in frequencia.index[::-1]}
+    
+    def _caminho(self, bairro, cep, cep_por_bairro: Dict[str, str]) -> tuple:
+        """Posição na árvore: 5 prefixos de CEP seguidos do bairro
+        
+        O bairro é localizado pelo CEP mais comum entre seus motoboys, para que todos
+        os motoboys (e a demanda) de um mesmo bairro fiquem na mesma folha.
+        """
+        chave = self._normalizar_bairro(bairro)
+        digitos = cep_por_bairro.get(chave)
+        if digitos is None and cep is not None and not pd.isna(cep):
+            digitos = normalizar_cep(cep)[:5]
+        if not digitos:
+            # Sem CEP conhecido: só casa com o próprio bairro ou na raiz
+            return (('?', chave),) * 5 + (chave,)
+        digitos = digitos.ljust(5, '?')
+        return tuple(digitos[:i] for i in range(1, 6)) + (chave,)
+    
+    @staticmethod
+    def _normalizar_bairro(bairro) -> str:
+        """Normaliza o nome do bairro para comparação (sem acentos, minúsculo)"""
+        if bairro is None or pd.isna(bairro):
+            return ''
+        texto = unicodedata.normalize('NFKD', str(bairro).strip().lower())
+        return ''.join(caractere for caractere in texto if not unicodedata.combining(caractere))
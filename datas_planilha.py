@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversão de Datas das Planilhas
+================================
+
+Converte colunas de data lidas do Excel ou de CSV, que podem misturar datas
+nativas, números seriais do Excel e textos em formatos variados. Usada pelas
+planilhas de agendamento, de ausências e de demanda, para que todas interpretem
+as datas da mesma forma.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Formatos testados na detecção automática das colunas de data
+FORMATOS_DATA_AGENDAMENTO = [
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y',
+    '%d/%m/%y %H:%M',
+    '%d/%m/%y',
+    '%d-%m-%Y %H:%M',
+    '%d-%m-%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+]
+
+def converter_coluna_data(serie: pd.Series, formato: str = None,
+                          descricao: str = 'agendamentos') -> pd.Series:
+    """Converte uma coluna de data para datetime
+    
+    Cada tipo de célula segue o caminho mais rápido: datas nativas do Excel são
+    usadas diretamente, números são tratados como datas seriais do Excel e textos
+    são convertidos de forma vetorizada no 'formato' informado (ou detectado em uma
+    amostra) e, o que não casar, nos demais formatos conhecidos. Só o que sobrar
+    passa pela conversão lenta, elemento a elemento. 'descricao' nomeia as linhas
+    no aviso de datas não reconhecidas.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.astype('datetime64[ns]')
+    if pd.api.types.is_numeric_dtype(serie):
+        resultado = _converter_serial_excel(serie)
+        _avisar_datas_invalidas(serie.astype(object), resultado, descricao)
+        return resultado
+    
+    valores = serie.astype(object)
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    
+    if pd.api.types.infer_dtype(valores, skipna=True) == 'string':
+        eh_texto = valores.notna()
+    else:
+        tipos = valores.map(type)
+        eh_texto = tipos == str
+        eh_data = valores.map(lambda valor: isinstance(valor, date)) & valores.notna()
+        eh_numero = tipos.isin([int, float, np.int64, np.float64]) & valores.notna()
+        
+        if eh_data.any():
+            resultado[eh_data] = pd.to_datetime(valores[eh_data].tolist(), errors='coerce')
+        if eh_numero.any():
+            resultado[eh_numero] = _converter_serial_excel(valores[eh_numero].astype(float))
+    
+    textos = valores[eh_texto].str.strip()
+    textos = textos[textos != '']
+    if not textos.empty:
+        formato = formato or _inferir_formato_data(textos, descricao)
+        if formato:
+            convertidos = pd.to_datetime(textos, format=formato, errors='coerce')
+        else:
+            convertidos = pd.Series(pd.NaT, index=textos.index, dtype='datetime64[ns]')
+        
+        # Formatos fixos antes da conversão lenta, que com dayfirst inverteria dia e mês
+        # de datas ISO (2026-01-07 viraria 1º de julho)
+        for outro_formato in FORMATOS_DATA_AGENDAMENTO:
+            restantes = convertidos.isna()
+            if not restantes.any():
+                break
+            if outro_formato != formato:
+                convertidos[restantes] = pd.to_datetime(textos[restantes], format=outro_formato, errors='coerce')
+        
+        restantes = convertidos.isna()
+        if restantes.any():
+            convertidos[restantes] = _converter_datas_mistas(textos[restantes])
+        resultado[textos.index] = convertidos
+    
+    _avisar_datas_invalidas(valores, resultado, descricao)
+    return resultado
+
+def _avisar_datas_invalidas(valores: pd.Series, resultado: pd.Series, descricao: str):
+    """Registra as células preenchidas que não viraram data"""
+    nao_convertidas = valores[resultado.isna() & valores.notna()].astype(str).str.strip()
+    invalidas = nao_convertidas[nao_convertidas != '']
+    if not invalidas.empty:
+        exemplos = ', '.join(invalidas.head(5))
+        logger.warning(f"{len(invalidas)} {descricao} com data não reconhecida foram ignorados "
+                       f"(ex.: {exemplos})")
+
+def _inferir_formato_data(textos: pd.Series, descricao: str, tamanho_amostra: int = 200) -> Optional[str]:
+    """Escolhe, entre os formatos conhecidos, o que converte mais valores de uma amostra"""
+    amostra = textos.drop_duplicates().head(tamanho_amostra).tolist()
+    melhor_formato, melhor_total = None, 0
+    for formato in FORMATOS_DATA_AGENDAMENTO:
+        total = 0
+        for texto in amostra:
+            try:
+                datetime.strptime(texto, formato)
+                total += 1
+            except ValueError:
+                pass
+        if total > melhor_total:
+            melhor_formato, melhor_total = formato, total
+        if total == len(amostra):
+            break
+    
+    if melhor_formato:
+        logger.info(f"Formato de data detectado ({descricao}): {melhor_formato}")
+    return melhor_formato
+
+def _converter_serial_excel(numeros: pd.Series) -> pd.Series:
+    """Converte datas seriais do Excel (dias desde 30/12/1899)"""
+    numeros = numeros.astype(float).where((numeros >= 1) & (numeros < 2958466))
+    return pd.to_datetime(numeros, unit='D', origin='1899-12-30', errors='coerce').astype('datetime64[ns]')
+
+def _converter_datas_mistas(textos: pd.Series) -> pd.Series:
+    """Conversão lenta, elemento a elemento, para textos fora dos formatos conhecidos"""
+    try:
+        return pd.to_datetime(textos, dayfirst=True, errors='coerce', format='mixed')
+    except (TypeError, ValueError):
+        # pandas < 2.0 não aceita format='mixed'
+        return pd.to_datetime(textos, dayfirst=True, errors='coerce')
@@ -14,23 +14,29 @@ Data: 2024
 """
 
 import pandas as pd
+import numpy as np
 import os
 import sys
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 from tkcalendar import Calendar
 from datetime import datetime, date
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
 import locale
 import json
+import argparse
+import hashlib
+import re
+import queue
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
+from alocacao_motoboys import AlocadorMotoboys, normalizar_cep
+from datas_planilha import converter_coluna_data
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -42,11 +48,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rótulos dos dias da semana, na ordem de Timestamp.dayofweek (segunda = 0)
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
 class ConfigManager:
     """Gerenciador de configurações do sistema"""
     
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json", estrito: bool = False):
         self.config_file = config_file
+        # Estrito: um arquivo de configuração inválido é erro, em vez de cair nas configurações padrão
+        self.estrito = estrito
         self.config = self._load_config()
     
     def _load_config(self) -> dict:
@@ -54,18 +65,53 @@ class ConfigManager:
         default_config = {
             "arquivos": {
                 "cadastro": "Entregadores.xlsx",
-                "agendamento": "Pedidos.xls"
+                "agendamento": "Pedidos.xls",
+                "ausencias": ""
             },
             "planilha": {
                 "header_agendamento": 3,
                 "colunas_cadastro": ["nome", "telefone", "cidade", "bairro", "cep"],
                 "coluna_entregador": "entregador",
-                "coluna_data": "data_agendamento"
+                "coluna_data": "data_agendamento",
+                "formato_data_agendamento": None
             },
             "relatorio": {
                 "formato_data": "%d/%m/%Y",
                 "nome_excel": "Motoboys_Nao_Escalados.xlsx",
-                "nome_pdf": "Motoboys_Nao_Escalados.pdf"
+                "nome_pdf": "Motoboys_Nao_Escalados.pdf",
+                "nome_csv": "Motoboys_Nao_Escalados.csv",
+                "nome_parquet": "Motoboys_Nao_Escalados.parquet",
+                "nome_jsonl": "Motoboys_Nao_Escalados.jsonl",
+                "formatos": ["excel", "pdf"],
+                "diretorio_saida": ""
+            },
+            "disponibilidade": {
+                "max_pedidos_dia": None
+            },
+            "alocacao": {
+                "arquivo_demanda": "Demanda.xlsx",
+                "nome_base": "Escala_Motoboys"
+            },
+            "proximidade": {
+                "top_k": 5
+            },
+            "padroes_semana": {
+                "exportar": False
+            },
+            "mudancas": {
+                "arquivo_estado": "estado_disponibilidade.json",
+                "nome_base": "Mudancas_Disponibilidade"
+            },
+            "snapshot": {
+                "diretorio": "snapshot_dados",
+                "publicar": False,
+                "usar": False
+            },
+            "particao": {
+                "coluna": None,
+                "prefixo_cep": 5,
+                "modo": "arquivos",
+                "max_workers": 4
             },
             "interface": {
                 "titulo": "Sistema de Disponibilidade de Motoboys",
@@ -81,6 +127,8 @@ class ConfigManager:
                 # Mesclar com configurações padrão
                 return self._merge_config(default_config, config)
             except Exception as e:
+                if self.estrito:
+                    raise ValueError(f"Arquivo de configuração inválido ({self.config_file}): {e}") from e
                 logger.warning(f"Erro ao carregar configurações: {e}. Usando configurações padrão.")
         
         return default_config
@@ -114,18 +162,130 @@ class ConfigManager:
                 return default
         return value
 
+class CacheCadastro:
+    """Cache de planilhas de cadastro já normalizadas, compartilhado entre processadores
+    
+    Cada arquivo (caminho + data de modificação) é lido uma única vez, mesmo com
+    vários perfis carregando ao mesmo tempo. Os DataFrames do cache não devem ser
+    alterados por quem os recebe.
+    """
+    
+    def __init__(self):
+        self._frames = {}
+        self._travas = {}
+        self._trava = threading.Lock()
+    
+    def obter(self, cadastro_path: str, carregar: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """Retorna o cadastro do cache, carregando-o na primeira vez"""
+        chave = (os.path.abspath(cadastro_path), os.path.getmtime(cadastro_path))
+        with self._trava:
+            trava = self._travas.setdefault(chave, threading.Lock())
+        
+        with trava:
+            if chave in self._frames:
+                logger.info(f"Reutilizando cadastro já carregado: {cadastro_path}")
+            else:
+                self._frames[chave] = carregar(cadastro_path)
+            return self._frames[chave]
+
+class IndiceCEP:
+    """Índice ordenado dos CEPs do cadastro para buscas por proximidade
+    
+    Os CEPs são convertidos para números de 8 dígitos e ordenados uma única vez;
+    como o CEP é hierárquico (região, sub-região, setor...), CEPs numericamente
+    próximos são geograficamente próximos. A busca localiza o CEP por busca binária
+    e percorre os vizinhos em ordem de distância.
+    """
+    
+    def __init__(self, ceps: pd.Series):
+        normalizados = ceps.astype(object).map(normalizar_cep)
+        validos = (normalizados != '').to_numpy()
+        
+        valores = normalizados[validos].astype(np.int64).to_numpy()
+        ordem = np.argsort(valores, kind='stable')
+        self.ceps = valores[ordem]
+        self.posicoes = np.flatnonzero(validos)[ordem]  # posição de cada CEP no cadastro
+    
+    def __len__(self) -> int:
+        return len(self.ceps)
+    
+    def vizinhos(self, cep: str):
+        """Percorre (posição no cadastro, distância) do CEP mais próximo ao mais distante"""
+        # CEP digitado com menos de 8 dígitos é um prefixo (ex.: '01310')
+        digitos = normalizar_cep(cep, prefixo=True)
+        if not digitos:
+            raise ValueError(f"CEP inválido: {cep}")
+        alvo = int(digitos)
+        
+        direita = int(np.searchsorted(self.ceps, alvo))
+        esquerda = direita - 1
+        while esquerda >= 0 or direita < len(self.ceps):
+            distancia_esquerda = alvo - self.ceps[esquerda] if esquerda >= 0 else None
+            distancia_direita = self.ceps[direita] - alvo if direita < len(self.ceps) else None
+            if distancia_direita is None or (distancia_esquerda is not None and distancia_esquerda <= distancia_direita):
+                yield int(self.posicoes[esquerda]), int(distancia_esquerda)
+                esquerda -= 1
+            else:
+                yield int(self.posicoes[direita]), int(distancia_direita)
+                direita += 1
+
+class CalendarioAusencias:
+    """Folgas, férias e afastamentos dos motoboys, guardados como bits por dia
+    
+    Só os motoboys com alguma ausência têm uma linha de bits (um bit por dia a partir
+    da primeira ausência), compactada com numpy.packbits: um ano ocupa 46 bytes por
+    motoboy. Consultar uma data lê uma única coluna de bytes da matriz.
+    """
+    
+    def __init__(self, nomes: pd.Series, ausencias: pd.DataFrame):
+        self.total_motoboys = len(nomes)
+        
+        # Cada ausência vale para todas as linhas do cadastro com o mesmo nome
+        posicoes = pd.DataFrame({'nome': nomes.astype(object).to_numpy(), 'linha': np.arange(len(nomes))})
+        ausencias = ausencias.merge(posicoes, on='nome')
+        
+        self.inicio = ausencias['inicio'].min() if not ausencias.empty else pd.Timestamp(0)
+        self.total_dias = (ausencias['fim'].max() - self.inicio).days + 1 if not ausencias.empty else 0
+        self.linhas, linha_bits = np.unique(ausencias['linha'].to_numpy(), return_inverse=True)
+        
+        # Intervalos marcados com +1 no início e -1 após o fim; a soma acumulada dá os dias ausentes
+        marcas = np.zeros((len(self.linhas), self.total_dias + 1), dtype=np.int16)
+        np.add.at(marcas, (linha_bits, (ausencias['inicio'] - self.inicio).dt.days.to_numpy()), 1)
+        np.add.at(marcas, (linha_bits, (ausencias['fim'] - self.inicio).dt.days.to_numpy() + 1), -1)
+        self.bits = np.packbits(np.cumsum(marcas[:, :-1], axis=1) > 0, axis=1)
+    
+    def ausentes(self, dia: date) -> np.ndarray:
+        """Máscara, alinhada ao cadastro, dos motoboys ausentes no dia"""
+        mascara = np.zeros(self.total_motoboys, dtype=bool)
+        deslocamento = (pd.Timestamp(dia) - self.inicio).days
+        if 0 <= deslocamento < self.total_dias:
+            coluna = self.bits[:, deslocamento >> 3]
+            mascara[self.linhas] = (coluna >> (7 - (deslocamento & 7))) & 1
+        return mascara
+
 class DataProcessor:
     """Processador de dados das planilhas"""
     
-    def __init__(self, config: ConfigManager):
+    def __init__(self, config: ConfigManager, cache_cadastro: 'CacheCadastro' = None):
         self.config = config
         self.cadastro_df = None
         self.agendamento_df = None
         self.data_col = None
         self.entregador_col = None
+        self.carga_diaria = None
+        self.origem = None
+        self.cache_cadastro = cache_cadastro
+        self.indice_cep = None
+        self.calendario_ausencias = None
+        self.origem_ausencias = None
+        self._padroes_cache = {}
+        self._estado_pendente = None
     
-    def carregar_dados(self, cadastro_path: str = None, agendamento_path: str = None) -> bool:
+    def carregar_dados(self, cadastro_path: str = None, agendamento_path: str = None,
+                       progresso: Callable[[str, int], None] = None) -> bool:
         """Carrega os dados das planilhas"""
+        # Notifica o andamento do carregamento (mensagem, percentual)
+        progresso = progresso or (lambda mensagem, percentual: None)
         try:
             # Usar caminhos fornecidos ou da configuração
             if not cadastro_path:
@@ -139,18 +299,41 @@ class DataProcessor:
             if not os.path.exists(agendamento_path):
                 raise FileNotFoundError(f"Arquivo de agendamento não encontrado: {agendamento_path}")
             
+            # Reaproveitar o snapshot publicado por outro processo, se estiver atualizado
+            if self.config.get('snapshot.usar') and self.anexar_snapshot(
+                    cadastro_path=cadastro_path, agendamento_path=agendamento_path):
+                progresso("Dados carregados do snapshot", 100)
+                return True
+            
             # Ler as planilhas
-            logger.info(f"Carregando arquivo de cadastro: {cadastro_path}")
-            self.cadastro_df = pd.read_excel(cadastro_path)
+            self.origem = None
+            progresso("Lendo planilha de cadastro...", 10)
+            if self.cache_cadastro is not None:
+                self.cadastro_df = self.cache_cadastro.obter(cadastro_path, self._ler_cadastro)
+            else:
+                self.cadastro_df = self._ler_cadastro(cadastro_path)
+            self._construir_indice_cep()
             
             header_row = self.config.get('planilha.header_agendamento', 3)
             logger.info(f"Carregando arquivo de agendamento: {agendamento_path} (header: {header_row})")
+            progresso("Lendo planilha de agendamento...", 40)
             self.agendamento_df = pd.read_excel(agendamento_path, header=header_row)
             
             # Processar dados
-            self._processar_cadastro()
+            progresso("Processando dados...", 80)
             self._processar_agendamento()
+            self.carregar_ausencias()
             
+            self.origem = self._assinatura_arquivos(cadastro_path, agendamento_path)
+            if self.config.get('snapshot.publicar'):
+                progresso("Publicando snapshot...", 90)
+                try:
+                    self.publicar_snapshot()
+                except Exception as e:
+                    # Os dados já estão carregados; só os outros processos deixam de aproveitá-los
+                    logger.warning(f"Snapshot não publicado: {e}")
+            
+            progresso("Dados carregados", 100)
             logger.info("Dados carregados com sucesso")
             return True
             
@@ -158,6 +341,249 @@ class DataProcessor:
             logger.error(f"Erro ao carregar dados: {e}")
             raise
     
+    def dados_atualizados(self, cadastro_path: str, agendamento_path: str) -> bool:
+        """Indica se os dados em memória correspondem aos arquivos (caminho e data de modificação)"""
+        if self.origem is None:
+            return False
+        try:
+            ausencias_path = self.config.get('arquivos.ausencias')
+            if self.origem_ausencias != (self._assinatura_arquivos(ausencias_path) if ausencias_path else None):
+                return False
+            return self.origem == self._assinatura_arquivos(cadastro_path, agendamento_path)
+        except OSError:
+            return False
+    
+    def _assinatura_arquivos(self, *caminhos: str) -> tuple:
+        """Identifica os arquivos carregados pelo caminho absoluto e data de modificação"""
+        return tuple((os.path.abspath(caminho), os.path.getmtime(caminho)) for caminho in caminhos)
+    
+    def publicar_snapshot(self, diretorio: str = None) -> Optional[str]:
+        """Publica os dados normalizados em arquivos Arrow IPC para outros processos
+        
+        Cada par de planilhas (e configuração de planilha) tem sua própria subpasta, para
+        que perfis diferentes publicando no mesmo diretório não se sobrescrevam.
+        """
+        if self.origem is None:
+            raise ValueError("Nenhum dado carregado das planilhas para publicar")
+        diretorio = self._pasta_snapshot(diretorio, *(caminho for caminho, _ in self.origem))
+        try:
+            import pyarrow as pa
+        except ImportError:
+            logger.warning("Biblioteca 'pyarrow' não instalada; snapshot não publicado")
+            return None
+        
+        try:
+            # Cada publicação vai para uma pasta nova; 'atual.json' é trocado atomicamente ao final,
+            # então quem já mapeou a versão anterior continua lendo arquivos íntegros
+            versao = f"v{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{os.getpid()}_{threading.get_ident()}"
+            pasta_versao = os.path.join(diretorio, versao)
+            os.makedirs(pasta_versao, exist_ok=True)
+            
+            carga = self.carga_diaria.rename('pedidos').reset_index()
+            for nome, df in (('cadastro', self.cadastro_df), ('agendamento', self.agendamento_df),
+                             ('carga', carga)):
+                tabela = pa.Table.from_pandas(self._preparar_para_arrow(df), preserve_index=False)
+                with pa.OSFile(os.path.join(pasta_versao, f"{nome}.arrow"), 'wb') as sink:
+                    with pa.ipc.new_file(sink, tabela.schema) as writer:
+                        writer.write_table(tabela)
+            
+            metadados = {
+                'versao': versao,
+                'origem': self.origem,
+                'planilha': self.config.get('planilha'),
+                'data_col': self.data_col,
+                'entregador_col': self.entregador_col,
+            }
+            indice = os.path.join(diretorio, 'atual.json')
+            substituida = self._versao_publicada(indice)
+            temporario = os.path.join(diretorio, f"atual.json.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(metadados, f, ensure_ascii=False)
+            os.replace(temporario, indice)
+            
+            # Remover só as versões anteriores à substituída: ela pode estar mapeada por quem
+            # acabou de ler 'atual.json', e as mais novas podem estar sendo escritas agora
+            # (a remoção pode falhar se ainda estiverem mapeadas, o que é inofensivo)
+            if substituida:
+                for antiga in os.listdir(diretorio):
+                    caminho = os.path.join(diretorio, antiga)
+                    if os.path.isdir(caminho) and antiga < substituida and antiga != versao:
+                        shutil.rmtree(caminho, ignore_errors=True)
+            
+            logger.info(f"Snapshot publicado: {pasta_versao}")
+            return pasta_versao
+            
+        except Exception as e:
+            logger.error(f"Erro ao publicar snapshot: {e}")
+            raise
+    
+    def anexar_snapshot(self, diretorio: str = None, cadastro_path: str = None,
+                        agendamento_path: str = None) -> bool:
+        """Usa um snapshot publicado via memory-map, sem ler nem copiar as planilhas
+        
+        Se os caminhos das planilhas forem informados, o snapshot só é usado quando
+        foi gerado a partir desses mesmos arquivos (mesma data de modificação).
+        """
+        diretorio = self._pasta_snapshot(diretorio,
+                                         cadastro_path or self.config.get('arquivos.cadastro'),
+                                         agendamento_path or self.config.get('arquivos.agendamento'))
+        indice = os.path.join(diretorio, 'atual.json')
+        if not os.path.exists(indice):
+            return False
+        try:
+            import pyarrow as pa
+        except ImportError:
+            logger.warning("Biblioteca 'pyarrow' não instalada; snapshot ignorado")
+            return False
+        
+        try:
+            with open(indice, 'r', encoding='utf-8') as f:
+                metadados = json.load(f)
+            
+            origem = tuple(tuple(item) for item in metadados['origem'])
+            if cadastro_path and agendamento_path:
+                if origem != self._assinatura_arquivos(cadastro_path, agendamento_path):
+                    logger.info("Snapshot desatualizado em relação às planilhas; ignorando")
+                    return False
+            if metadados['planilha'] != self.config.get('planilha'):
+                logger.info("Snapshot gerado com outra configuração de planilha; ignorando")
+                return False
+            
+            pasta_versao = os.path.join(diretorio, metadados['versao'])
+            frames = {}
+            for nome in ('cadastro', 'agendamento'):
+                # Tabela mapeada em memória; ArrowDtype mantém as colunas apontando para o mapeamento
+                fonte = pa.memory_map(os.path.join(pasta_versao, f"{nome}.arrow"), 'r')
+                tabela = pa.ipc.open_file(fonte).read_all()
+                frames[nome] = tabela.to_pandas(types_mapper=pd.ArrowDtype)
+            
+            self.cadastro_df = frames['cadastro']
+            self.agendamento_df = frames['agendamento']
+            self.data_col = metadados['data_col']
+            self.entregador_col = metadados['entregador_col']
+            self.origem = origem
+            self._anexar_carga(pa, os.path.join(pasta_versao, 'carga.arrow'))
+            # Índice de CEP e calendário de ausências são reconstruídos (são baratos e
+            # o calendário depende da planilha de ausências, que não faz parte do snapshot)
+            self._construir_indice_cep()
+            self.carregar_ausencias()
+            
+            logger.info(f"Snapshot anexado: {pasta_versao}")
+            return True
+            
+        except Exception as e:
+            # Snapshot trocado ou removido durante a leitura: recai no carregamento normal
+            logger.warning(f"Erro ao anexar snapshot: {e}")
+            return False
+    
+    def _anexar_carga(self, pa, caminho: str):
+        """Usa a carga diária publicada no snapshot (recalcula se a versão não a tiver)"""
+        if not os.path.exists(caminho):
+            self._calcular_carga()
+            return
+        carga = pa.ipc.open_file(pa.memory_map(caminho, 'r')).read_all().to_pandas()
+        carga['dia'] = carga['dia'].astype('datetime64[ns]')
+        self.carga_diaria = carga.set_index(['dia', 'entregador'])['pedidos'].rename(None)
+        self._padroes_cache = {}
+    
+    def _pasta_snapshot(self, diretorio: Optional[str], cadastro_path: str, agendamento_path: str) -> str:
+        """Subpasta do snapshot das planilhas informadas, dentro de snapshot.diretorio"""
+        diretorio = diretorio or self.config.get('snapshot.diretorio', 'snapshot_dados')
+        identificacao = json.dumps([os.path.abspath(cadastro_path), os.path.abspath(agendamento_path),
+                                    self.config.get('planilha')], sort_keys=True, ensure_ascii=False)
+        return os.path.join(diretorio, hashlib.sha1(identificacao.encode('utf-8')).hexdigest()[:16])
+    
+    def _versao_publicada(self, indice: str) -> Optional[str]:
+        """Versão apontada atualmente por 'atual.json' (None se não houver)"""
+        try:
+            with open(indice, 'r', encoding='utf-8') as f:
+                return json.load(f).get('versao')
+        except (OSError, ValueError):
+            return None
+    
+    def _preparar_para_arrow(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Converte colunas com tipos misturados (ex.: datas e textos) para texto"""
+        import pyarrow as pa
+        convertidas = {}
+        for col in df.columns:
+            if df[col].dtype == object:
+                try:
+                    pa.array(df[col], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    convertidas[col] = 'string'
+        df = df.astype(convertidas) if convertidas else df
+        return df.rename(columns=str)
+    
+    def carregar_ausencias(self, ausencias_path: str = None):
+        """Carrega o calendário de ausências (nome, início, fim) configurado em arquivos.ausencias"""
+        ausencias_path = ausencias_path or self.config.get('arquivos.ausencias')
+        if not ausencias_path:
+            self.calendario_ausencias = None
+            self.origem_ausencias = None
+            return
+        if not os.path.exists(ausencias_path):
+            raise FileNotFoundError(f"Arquivo de ausências não encontrado: {ausencias_path}")
+        
+        ausencias = self._ler_ausencias(ausencias_path)
+        self.calendario_ausencias = CalendarioAusencias(self.cadastro_df['nome'], ausencias)
+        self.origem_ausencias = self._assinatura_arquivos(ausencias_path)
+        
+        desconhecidos = set(ausencias['nome']) - set(self.cadastro_df['nome'].astype(object))
+        if desconhecidos:
+            logger.warning(f"{len(desconhecidos)} motoboys do arquivo de ausências não estão no cadastro "
+                           f"(ex.: {', '.join(sorted(desconhecidos)[:5])})")
+        logger.info(f"Ausências carregadas: {len(ausencias)} períodos de "
+                    f"{len(self.calendario_ausencias.linhas)} motoboys")
+    
+    def _ler_ausencias(self, ausencias_path: str) -> pd.DataFrame:
+        """Lê a planilha de ausências, com uma linha por período (nome, início e fim)"""
+        logger.info(f"Carregando arquivo de ausências: {ausencias_path}")
+        if ausencias_path.lower().endswith('.csv'):
+            ausencias = pd.read_csv(ausencias_path, sep=None, engine='python')
+        else:
+            ausencias = pd.read_excel(ausencias_path)
+        
+        ausencias.columns = ausencias.columns.astype(str).str.strip().str.lower()
+        if 'nome' not in ausencias.columns:
+            raise ValueError("Coluna 'nome' não encontrada na planilha de ausências")
+        coluna_inicio = next((col for col in ausencias.columns
+                              if any(palavra in col for palavra in ['inicio', 'início', 'inicial'])),
+                             'data' if 'data' in ausencias.columns else None)
+        if not coluna_inicio:
+            raise ValueError("Coluna de início não encontrada na planilha de ausências")
+        coluna_fim = next((col for col in ausencias.columns
+                           if any(palavra in col for palavra in ['fim', 'final', 'até', 'ate'])), None)
+        
+        # Mesma conversão do agendamento: datas nativas, seriais do Excel e textos
+        inicio = converter_coluna_data(ausencias[coluna_inicio], descricao='registros de ausência').dt.normalize()
+        fim = (converter_coluna_data(ausencias[coluna_fim], descricao='registros de ausência').dt.normalize()
+               if coluna_fim else pd.Series(pd.NaT, index=ausencias.index, dtype='datetime64[ns]'))
+        # Sem data de fim, a ausência é de um único dia
+        fim = fim.fillna(inicio)
+        
+        resultado = pd.DataFrame({
+            'nome': ausencias['nome'].astype(str).str.strip().str.lower(),
+            'inicio': inicio.astype('datetime64[ns]'),
+            'fim': fim.astype('datetime64[ns]'),
+        })
+        invalidas = resultado['inicio'].isna() | (resultado['fim'] < resultado['inicio'])
+        if invalidas.any():
+            logger.warning(f"{int(invalidas.sum())} ausências sem data válida ou com fim antes do início ignoradas")
+        return resultado[~invalidas]
+    
+    def _ausentes_no_dia(self, data_obj: date) -> np.ndarray:
+        """Máscara, alinhada ao cadastro, dos motoboys de folga ou afastados na data"""
+        if self.calendario_ausencias is None:
+            return np.zeros(len(self.cadastro_df), dtype=bool)
+        return self.calendario_ausencias.ausentes(data_obj)
+    
+    def _ler_cadastro(self, cadastro_path: str) -> pd.DataFrame:
+        """Lê e normaliza a planilha de cadastro"""
+        logger.info(f"Carregando arquivo de cadastro: {cadastro_path}")
+        self.cadastro_df = pd.read_excel(cadastro_path)
+        self._processar_cadastro()
+        return self.cadastro_df
+    
     def _processar_cadastro(self):
         """Processa dados de cadastro"""
         # Padronizar nomes das colunas
@@ -174,6 +600,11 @@ class DataProcessor:
         if 'telefone' in self.cadastro_df.columns:
             self.cadastro_df['telefone'] = self.cadastro_df['telefone'].astype(str).str.replace('.0', '', regex=False)
         
+        # CEP como texto (00000-000), recuperando o zero à esquerda perdido quando o Excel o guarda como número
+        if 'cep' in self.cadastro_df.columns:
+            ceps = self.cadastro_df['cep'].astype(object).map(normalizar_cep)
+            self.cadastro_df['cep'] = (ceps.str[:5] + '-' + ceps.str[5:]).where(ceps != '', self.cadastro_df['cep'])
+        
         logger.info(f"Processados {len(self.cadastro_df)} registros de cadastro")
     
     def _processar_agendamento(self):
@@ -193,8 +624,30 @@ class DataProcessor:
         if not self.data_col:
             raise ValueError("Coluna de data não encontrada na planilha de agendamento")
         
+        # Converter as datas uma única vez, no carregamento
+        self.agendamento_df['dia_agendamento'] = self._converter_coluna_data(
+            self.agendamento_df[self.data_col]
+        ).dt.normalize()
+        
+        self._calcular_carga()
+        
         logger.info(f"Processados {len(self.agendamento_df)} registros de agendamento")
     
+    def _converter_coluna_data(self, serie: pd.Series) -> pd.Series:
+        """Converte a coluna de data do agendamento (com o formato configurado, se houver)"""
+        return converter_coluna_data(serie, self.config.get('planilha.formato_data_agendamento'))
+    
+    def _calcular_carga(self):
+        """Pré-calcula a quantidade de pedidos por dia e motoboy"""
+        dias = self.agendamento_df['dia_agendamento'].astype('datetime64[ns]')
+        self.carga_diaria = (
+            self.agendamento_df.groupby([dias, self.agendamento_df['entregador'].astype(object)])
+            .size()
+            .rename_axis(['dia', 'entregador'])
+            .sort_index()
+        )
+        self._padroes_cache = {}
+    
     def _encontrar_coluna_entregador(self) -> Optional[str]:
         """Encontra a coluna do entregador automaticamente"""
         # Tentar encontrar por nome exato primeiro
@@ -238,55 +691,485 @@ class DataProcessor:
         return None
     
     def obter_motoboys_disponiveis(self, datas: List[str]) -> Dict[str, pd.DataFrame]:
-        """Obtém motoboys disponíveis para as datas especificadas"""
+        """Obtém motoboys disponíveis para as datas especificadas
+        
+        Sem 'disponibilidade.max_pedidos_dia', qualquer pedido no dia torna o motoboy
+        indisponível. Com o limite configurado, ele continua disponível até atingi-lo e
+        o resultado traz a coluna 'pedidos_no_dia', ordenado do menos para o mais ocupado.
+        """
         nao_agendados_por_data = {}
+        limite = self.config.get('disponibilidade.max_pedidos_dia')
+        
+        datas_validas = self._converter_datas(datas)
+        carga = self.carga_por_data(list(datas_validas.values()))
+        
+        # Selecionar colunas desejadas
+        colunas_desejadas = [
+            col for col in self.config.get('planilha.colunas_cadastro', [])
+            if col in self.cadastro_df.columns
+        ]
+        
+        for data_str, data_obj in datas_validas.items():
+            pedidos = carga[pd.Timestamp(data_obj)]
+            disponivel = (pedidos < (limite or 1)).to_numpy() & ~self._ausentes_no_dia(data_obj)
+            
+            # Motoboys não agendados (ou abaixo do limite de pedidos)
+            motoboys_nao_agendados = self.cadastro_df[disponivel]
+            
+            if not motoboys_nao_agendados.empty:
+                resultado = motoboys_nao_agendados[colunas_desejadas].copy()
+                if limite:
+                    resultado['pedidos_no_dia'] = pedidos[disponivel]
+                    resultado = resultado.sort_values('pedidos_no_dia', kind='stable')
+                nao_agendados_por_data[data_str] = resultado
+        
+        return nao_agendados_por_data
+    
+    def obter_ranking_carga(self, datas: List[str]) -> Dict[str, pd.DataFrame]:
+        """Ordena todos os motoboys pela quantidade de pedidos em cada data (menos ocupados primeiro)"""
+        ranking_por_data = {}
+        limite = self.config.get('disponibilidade.max_pedidos_dia') or 1
+        
+        datas_validas = self._converter_datas(datas)
+        carga = self.carga_por_data(list(datas_validas.values()))
+        
+        colunas_desejadas = [
+            col for col in self.config.get('planilha.colunas_cadastro', [])
+            if col in self.cadastro_df.columns
+        ]
+        
+        for data_str, data_obj in datas_validas.items():
+            pedidos = carga[pd.Timestamp(data_obj)]
+            resultado = self.cadastro_df[colunas_desejadas].copy()
+            resultado['pedidos_no_dia'] = pedidos
+            resultado['disponivel'] = (pedidos < limite) & ~self._ausentes_no_dia(data_obj)
+            ranking_por_data[data_str] = resultado.sort_values('pedidos_no_dia', kind='stable')
+        
+        return ranking_por_data
+    
+    def padroes_semana(self, inicio: date = None, fim: date = None) -> pd.DataFrame:
+        """Dias trabalhados por motoboy em cada dia da semana e taxa de utilização no período
+        
+        Um dia conta como trabalhado se o motoboy tem ao menos um pedido nele. Sem
+        'inicio'/'fim', usa todo o período do agendamento carregado. O resultado fica em
+        cache até o próximo carregamento dos dados.
+        """
+        dias = self.carga_diaria.index.get_level_values('dia')
+        if inicio is None:
+            inicio = dias.min().date() if len(dias) else date.today()
+        if fim is None:
+            fim = dias.max().date() if len(dias) else inicio
+        if (inicio, fim) in self._padroes_cache:
+            return self._padroes_cache[(inicio, fim)]
+        
+        # carga_diaria já tem um único registro por (dia, entregador)
+        no_periodo = (dias >= pd.Timestamp(inicio)) & (dias <= pd.Timestamp(fim))
+        pares = self.carga_diaria.index[no_periodo]
+        tabela = (
+            pd.Series(1, index=pares)
+            .groupby([pares.get_level_values('entregador'), pares.get_level_values('dia').dayofweek])
+            .size()
+            .unstack(fill_value=0)
+            .reindex(index=self.cadastro_df['nome'].astype(object), columns=range(7), fill_value=0)
+            .fillna(0)
+            .astype(int)
+        )
+        tabela.columns = DIAS_SEMANA
+        
+        dias_no_periodo = max((fim - inicio).days + 1, 1)
+        tabela['dias_trabalhados'] = tabela.sum(axis=1)
+        tabela['utilizacao_pct'] = (tabela['dias_trabalhados'] / dias_no_periodo * 100).round(1)
+        resultado = tabela.rename_axis('nome').reset_index()
+        resultado.attrs['periodo'] = (inicio, fim)
+        
+        self._padroes_cache[(inicio, fim)] = resultado
+        logger.info(f"Padrões semanais calculados de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} "
+                    f"para {len(resultado)} motoboys")
+        return resultado
+    
+    def motoboys_proximos(self, data_str: str, cep: str, k: int = 5) -> pd.DataFrame:
+        """Os k motoboys disponíveis na data com CEP mais próximo do informado
+        
+        Usa o índice ordenado de CEPs: a busca parte da posição do CEP e se expande
+        para os dois lados, sem percorrer o cadastro inteiro.
+        """
+        if self.indice_cep is None:
+            raise ValueError("Coluna 'cep' não encontrada na planilha de cadastro")
+        data_obj = datetime.strptime(data_str, '%d/%m/%Y').date()
+        ocupados = self._ocupados_no_dia(data_obj)
+        ausentes = self._ausentes_no_dia(data_obj)
+        
+        posicoes, distancias = [], []
+        for posicao, distancia in self.indice_cep.vizinhos(cep):
+            if ausentes[posicao] or self.cadastro_df['nome'].iat[posicao] in ocupados:
+                continue
+            posicoes.append(posicao)
+            distancias.append(distancia)
+            if len(posicoes) >= k:
+                break
+        
+        colunas_desejadas = [
+            col for col in self.config.get('planilha.colunas_cadastro', [])
+            if col in self.cadastro_df.columns
+        ]
+        resultado = self.cadastro_df.iloc[posicoes][colunas_desejadas].copy()
+        resultado['distancia_cep'] = distancias
+        return resultado
+    
+    def _ocupados_no_dia(self, data_obj: date) -> set:
+        """Nomes dos motoboys que atingiram o limite de pedidos na data"""
+        limite = self.config.get('disponibilidade.max_pedidos_dia') or 1
+        try:
+            pedidos = self.carga_diaria.xs(pd.Timestamp(data_obj), level='dia')
+        except KeyError:
+            return set()
+        return set(pedidos.index[pedidos >= limite])
+    
+    def _construir_indice_cep(self):
+        """Monta o índice de CEPs do cadastro (se houver a coluna 'cep')"""
+        if 'cep' in self.cadastro_df.columns:
+            self.indice_cep = IndiceCEP(self.cadastro_df['cep'])
+        else:
+            self.indice_cep = None
+    
+    def calcular_mudancas(self, datas: List[str], arquivo_estado: str = None,
+                          salvar_estado: bool = True) -> Dict[str, pd.DataFrame]:
+        """Compara a disponibilidade atual com a da última execução salva
+        
+        Para cada data retorna quem foi 'liberado' (passou a estar disponível) e quem
+        foi 'escalado' (deixou de estar disponível). Datas cujo hash da lista de
+        disponíveis não mudou são ignoradas sem comparar os nomes. Sem estado anterior
+        para uma data, todos os disponíveis aparecem como 'liberado'.
+        
+        Com 'salvar_estado' falso, o novo estado fica pendente até confirmar_mudancas(),
+        para ser gravado só depois que o relatório for gerado com sucesso.
+        """
+        arquivo_estado = arquivo_estado or self.config.get('mudancas.arquivo_estado', 'estado_disponibilidade.json')
+        estado = self._carregar_estado(arquivo_estado)
+        disponiveis_por_data = self.obter_motoboys_disponiveis(datas)
         
+        colunas_desejadas = [
+            col for col in self.config.get('planilha.colunas_cadastro', [])
+            if col in self.cadastro_df.columns
+        ]
+        
+        mudancas_por_data = {}
+        for data_str in self._converter_datas(datas):
+            disponiveis = disponiveis_por_data.get(data_str)
+            nomes = disponiveis['nome'] if disponiveis is not None else pd.Series([], dtype=object)
+            hash_atual = self._hash_nomes(nomes)
+            anterior = estado.get(data_str)
+            
+            if anterior and anterior['hash'] == hash_atual:
+                continue
+            
+            atuais = set(nomes)
+            anteriores = set(anterior['nomes']) if anterior else set()
+            liberados = atuais - anteriores
+            escalados = anteriores - atuais
+            estado[data_str] = {'hash': hash_atual, 'nomes': sorted(atuais)}
+            
+            if not liberados and not escalados:
+                continue
+            
+            cadastro = self.cadastro_df[colunas_desejadas]
+            mudancas = pd.concat([
+                cadastro[self.cadastro_df['nome'].isin(liberados)].assign(mudanca='liberado'),
+                cadastro[self.cadastro_df['nome'].isin(escalados)].assign(mudanca='escalado'),
+            ])
+            # Motoboys que saíram do cadastro ainda aparecem como escalados, só com o nome
+            removidos = escalados - set(self.cadastro_df['nome'])
+            if removidos:
+                mudancas = pd.concat([mudancas, pd.DataFrame({'nome': sorted(removidos), 'mudanca': 'escalado'})])
+            
+            colunas = ['mudanca'] + [col for col in mudancas.columns if col != 'mudanca']
+            mudancas_por_data[data_str] = mudancas[colunas].sort_values(['mudanca', 'nome'], ignore_index=True)
+        
+        self._estado_pendente = (arquivo_estado, estado)
+        if salvar_estado:
+            self.confirmar_mudancas()
+        
+        logger.info(f"Mudanças de disponibilidade encontradas em {len(mudancas_por_data)} de {len(datas)} datas")
+        return mudancas_por_data
+    
+    def confirmar_mudancas(self):
+        """Grava o estado calculado pela última chamada de calcular_mudancas"""
+        if self._estado_pendente is None:
+            return
+        arquivo_estado, estado = self._estado_pendente
+        self._salvar_estado(arquivo_estado, estado)
+        self._estado_pendente = None
+    
+    def _hash_nomes(self, nomes: pd.Series) -> str:
+        """Hash da lista de nomes, independente da ordem"""
+        hashes = pd.util.hash_pandas_object(nomes.astype(object).dropna(), index=False).to_numpy()
+        return f"{len(hashes)}:{int(hashes.sum(dtype=np.uint64))}"
+    
+    def _carregar_estado(self, arquivo_estado: str) -> dict:
+        """Lê a disponibilidade salva na última execução"""
+        if not os.path.exists(arquivo_estado):
+            return {}
+        try:
+            with open(arquivo_estado, 'r', encoding='utf-8') as f:
+                return json.load(f).get('datas', {})
+        except Exception as e:
+            logger.warning(f"Erro ao ler estado anterior ({arquivo_estado}): {e}. Considerando sem estado anterior.")
+            return {}
+    
+    def _salvar_estado(self, arquivo_estado: str, estado: dict):
+        """Salva a disponibilidade atual para a próxima comparação"""
+        temporario = f"{arquivo_estado}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'gerado_em': datetime.now().isoformat(timespec='seconds'), 'datas': estado},
+                      f, ensure_ascii=False)
+        os.replace(temporario, arquivo_estado)
+    
+    def carga_por_data(self, datas: List[date]) -> pd.DataFrame:
+        """Pedidos de cada motoboy do cadastro (linhas) em cada data (colunas)"""
+        dias = pd.DatetimeIndex([pd.Timestamp(data_obj) for data_obj in datas])
+        no_periodo = self.carga_diaria[self.carga_diaria.index.get_level_values('dia').isin(dias)]
+        
+        tabela = (
+            no_periodo.unstack('dia', fill_value=0)
+            .reindex(index=self.cadastro_df['nome'].astype(object), columns=dias, fill_value=0)
+            .fillna(0)
+            .astype(int)
+        )
+        tabela.index = self.cadastro_df.index
+        return tabela
+    
+    def _converter_datas(self, datas: List[str]) -> Dict[str, date]:
+        """Converte as datas no formato DD/MM/AAAA, registrando as inválidas"""
+        convertidas = {}
         for data_str in datas:
             try:
-                # Converter string para date
-                data_obj = datetime.strptime(data_str, '%d/%m/%Y').date()
-                
-                # Filtrar agendados na data
-                agendados_no_dia = self.agendamento_df[
-                    pd.to_datetime(self.agendamento_df[self.data_col], dayfirst=True, errors='coerce').dt.date == data_obj
-                ]['entregador']
-                
-                # Motoboys não agendados
-                motoboys_nao_agendados = self.cadastro_df[~self.cadastro_df['nome'].isin(agendados_no_dia)]
-                
-                if not motoboys_nao_agendados.empty:
-                    # Selecionar colunas desejadas
-                    colunas_desejadas = [
-                        col for col in self.config.get('planilha.colunas_cadastro', [])
-                        if col in self.cadastro_df.columns
-                    ]
-                    resultado = motoboys_nao_agendados[colunas_desejadas].copy()
-                    nao_agendados_por_data[data_str] = resultado
-                    
+                convertidas[data_str] = datetime.strptime(data_str, '%d/%m/%Y').date()
             except Exception as e:
                 logger.error(f"Erro ao processar data {data_str}: {e}")
-                continue
+        return convertidas
+    
+    def particionar_disponiveis(self, dados_por_data: Dict[str, pd.DataFrame],
+                                coluna: str = None) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """Divide o resultado de disponibilidade por região (cidade, bairro ou prefixo de CEP)"""
+        coluna = coluna or self.config.get('particao.coluna')
+        if not coluna:
+            raise ValueError("Nenhuma coluna de partição configurada")
         
-        return nao_agendados_por_data
+        chave = self._chave_particao(coluna)
+        
+        # A disponibilidade já foi calculada uma vez; aqui só agrupamos pelo índice do cadastro
+        particoes = {}
+        for data_str, df in dados_por_data.items():
+            for valor, grupo in df.groupby(chave.loc[df.index], sort=True):
+                particoes.setdefault(valor, {})[data_str] = grupo
+        
+        logger.info(f"Disponibilidade particionada por '{coluna}' em {len(particoes)} regiões")
+        return particoes
+    
+    def _chave_particao(self, coluna: str) -> pd.Series:
+        """Calcula a chave de partição para cada motoboy do cadastro"""
+        if coluna not in self.cadastro_df.columns:
+            raise ValueError(f"Coluna '{coluna}' não encontrada na planilha de cadastro")
+        
+        if coluna == 'cep':
+            prefixo = self.config.get('particao.prefixo_cep', 5)
+            valores = self.cadastro_df[coluna].astype(object).map(normalizar_cep).str[:prefixo]
+        else:
+            valores = self.cadastro_df[coluna].astype(str).str.strip().str.title()
+        
+        vazios = self.cadastro_df[coluna].isna() | (valores == '')
+        return valores.mask(vazios, f"Sem {coluna.title()}")
 
 class RelatorioGenerator:
-    """Gerador de relatórios Excel e PDF"""
+    """Gerador de relatórios Excel, PDF, CSV, Parquet e JSON Lines"""
+    
+    # Formato -> (método gerador, chave do nome do arquivo na configuração, nome padrão)
+    FORMATOS = {
+        'excel': ('gerar_excel', 'relatorio.nome_excel', 'Motoboys_Nao_Escalados.xlsx'),
+        'pdf': ('gerar_pdf', 'relatorio.nome_pdf', 'Motoboys_Nao_Escalados.pdf'),
+        'csv': ('gerar_csv', 'relatorio.nome_csv', 'Motoboys_Nao_Escalados.csv'),
+        'parquet': ('gerar_parquet', 'relatorio.nome_parquet', 'Motoboys_Nao_Escalados.parquet'),
+        'jsonl': ('gerar_jsonl', 'relatorio.nome_jsonl', 'Motoboys_Nao_Escalados.jsonl'),
+    }
     
     def __init__(self, config: ConfigManager):
         self.config = config
     
-    def gerar_excel(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None) -> str:
-        """Gera relatório Excel"""
+    def gerar_relatorios(self, dados_por_data: Dict[str, pd.DataFrame], formatos: List[str] = None,
+                         nome_base: str = None, titulo: str = None,
+                         padroes: pd.DataFrame = None) -> Dict[str, str]:
+        """Gera os relatórios nos formatos indicados (padrão: relatorio.formatos)
+        
+        'nome_base' substitui o nome configurado dos arquivos (mantendo a extensão) e
+        'titulo' o título do PDF, para relatórios derivados como o de mudanças.
+        'padroes' (DataProcessor.padroes_semana) entra como aba extra no Excel e
+        seção extra no PDF.
+        """
+        formatos = formatos or self.config.get('relatorio.formatos', ['excel', 'pdf'])
+        caminhos = {}
+        for formato in formatos:
+            metodo, _, _ = self._formato(formato)
+            output_path = self.caminho_saida(formato, nome_base)
+            if formato == 'pdf':
+                caminhos[formato] = self.gerar_pdf(dados_por_data, output_path, titulo=titulo, padroes=padroes)
+            elif formato == 'excel':
+                caminhos[formato] = self.gerar_excel(dados_por_data, output_path, padroes=padroes)
+            else:
+                caminhos[formato] = getattr(self, metodo)(dados_por_data, output_path)
+        return caminhos
+    
+    def caminho_saida(self, formato: str, nome_base: str = None) -> str:
+        """Retorna o caminho do arquivo configurado para o formato"""
+        _, chave, padrao = self._formato(formato)
+        nome = self.config.get(chave, padrao)
+        if nome_base:
+            nome = nome_base + os.path.splitext(nome)[1]
+        diretorio = self.config.get('relatorio.diretorio_saida', '')
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        return os.path.join(diretorio, nome)
+    
+    def _formato(self, formato: str) -> Tuple[str, str, str]:
+        """Valida o formato de saída"""
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato de relatório inválido: {formato} "
+                             f"(use {', '.join(self.FORMATOS)})")
+        return self.FORMATOS[formato]
+    
+    def gerar_csv(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None) -> str:
+        """Gera CSV com uma coluna de data, escrevendo uma data por vez"""
         if not output_path:
-            output_path = self.config.get('relatorio.nome_excel', 'Motoboys_Nao_Escalados.xlsx')
+            output_path = self.caminho_saida('csv')
+        
+        try:
+            with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                cabecalho = True
+                for df in self._iterar_com_data(dados_por_data):
+                    df.to_csv(f, header=cabecalho, index=False)
+                    cabecalho = False
+            
+            logger.info(f"Relatório CSV gerado: {output_path}")
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Erro ao gerar CSV: {e}")
+            raise
+    
+    def gerar_jsonl(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None) -> str:
+        """Gera JSON Lines (um motoboy por linha), escrevendo uma data por vez"""
+        if not output_path:
+            output_path = self.caminho_saida('jsonl')
+        
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for df in self._iterar_com_data(dados_por_data):
+                    linhas = df.to_json(orient='records', lines=True, force_ascii=False)
+                    f.write(linhas if linhas.endswith('\n') else linhas + '\n')
+            
+            logger.info(f"Relatório JSON Lines gerado: {output_path}")
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Erro ao gerar JSON Lines: {e}")
+            raise
+    
+    def gerar_parquet(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None) -> str:
+        """Gera Parquet com um row group por data"""
+        if not output_path:
+            output_path = self.caminho_saida('parquet')
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Biblioteca 'pyarrow' necessária para gerar Parquet. Instale com: pip install pyarrow")
+        
+        try:
+            # Esquema único para todas as datas: as colunas podem vir com tipos diferentes
+            # em cada data (ex.: inteiros em uma, texto ou vazios em outra)
+            esquemas = [pa.Schema.from_pandas(df, preserve_index=False)
+                        for df in self._iterar_com_data(dados_por_data, data_como_texto=False)]
+            if esquemas:
+                esquema = self._esquema_comum(esquemas)
+                with pq.ParquetWriter(output_path, esquema) as writer:
+                    for df in self._iterar_com_data(dados_por_data, data_como_texto=False):
+                        tabela = pa.Table.from_pandas(df, preserve_index=False)
+                        writer.write_table(self._ajustar_ao_esquema(tabela, esquema))
+            else:
+                # Nenhuma data com motoboys disponíveis: arquivo vazio apenas com a coluna de data
+                pq.write_table(pa.table({'data': pa.array([], pa.date32())}), output_path)
+            
+            logger.info(f"Relatório Parquet gerado: {output_path}")
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Erro ao gerar Parquet: {e}")
+            raise
+    
+    def _esquema_comum(self, esquemas: list):
+        """Une os esquemas das datas: tipos iguais são mantidos, números viram float e o resto texto"""
+        import pyarrow as pa
+        tipos = {}
+        for esquema in esquemas:
+            for campo in esquema:
+                tipos.setdefault(campo.name, []).append(campo.type)
+        
+        campos = []
+        for nome, tipos_coluna in tipos.items():
+            # Colunas totalmente vazias em uma data não definem o tipo
+            distintos = list(dict.fromkeys(tipo for tipo in tipos_coluna if not pa.types.is_null(tipo)))
+            if len(distintos) == 1:
+                tipo = distintos[0]
+            elif distintos and all(pa.types.is_integer(tipo) for tipo in distintos):
+                tipo = pa.int64()
+            elif distintos and all(pa.types.is_integer(tipo) or pa.types.is_floating(tipo) for tipo in distintos):
+                tipo = pa.float64()
+            else:
+                tipo = pa.string()
+            campos.append(pa.field(nome, tipo))
+        return pa.schema(campos)
+    
+    def _ajustar_ao_esquema(self, tabela, esquema):
+        """Converte a tabela de uma data para o esquema comum (colunas ausentes ficam vazias)"""
+        import pyarrow as pa
+        colunas = []
+        for campo in esquema:
+            if campo.name in tabela.column_names:
+                coluna = tabela.column(campo.name)
+                if coluna.type != campo.type:
+                    coluna = coluna.cast(campo.type, safe=False)
+            else:
+                coluna = pa.nulls(len(tabela), campo.type)
+            colunas.append(coluna)
+        return pa.Table.from_arrays(colunas, schema=esquema)
+    
+    def _iterar_com_data(self, dados_por_data: Dict[str, pd.DataFrame], data_como_texto: bool = True):
+        """Percorre os resultados por data, adicionando a data como primeira coluna"""
+        for data_str, df in dados_por_data.items():
+            if df.empty:
+                continue
+            data_obj = datetime.strptime(data_str, '%d/%m/%Y').date()
+            # Colunas de texto viram 'string' para manter o mesmo esquema em todas as datas
+            saida = df.astype({col: 'string' for col in df.columns if df[col].dtype == object})
+            saida.insert(0, 'data', data_obj.isoformat() if data_como_texto else data_obj)
+            yield saida
+    
+    def gerar_excel(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None,
+                    padroes: pd.DataFrame = None) -> str:
+        """Gera relatório Excel (com a aba de padrões semanais, se informada)"""
+        if not output_path:
+            output_path = self.caminho_saida('excel')
         
         try:
             with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+                abas_usadas = set()
                 for data, df in dados_por_data.items():
                     if not df.empty:
                         # Nome da aba com data
-                        aba_nome = data.replace('/', '_')
+                        aba_nome = self._nome_aba(data, abas_usadas)
                         df.to_excel(writer, sheet_name=aba_nome, index=False)
+                if padroes is not None:
+                    padroes.to_excel(writer, sheet_name=self._nome_aba('Padrões Semanais', abas_usadas), index=False)
             
             logger.info(f"Relatório Excel gerado: {output_path}")
             return output_path
@@ -295,10 +1178,17 @@ class RelatorioGenerator:
             logger.error(f"Erro ao gerar Excel: {e}")
             raise
     
-    def gerar_pdf(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None) -> str:
-        """Gera relatório PDF"""
+    def gerar_pdf(self, dados_por_data: Dict[str, pd.DataFrame], output_path: str = None,
+                  titulo: str = None, padroes: pd.DataFrame = None) -> str:
+        """Gera relatório PDF (com a seção de padrões semanais, se informada)"""
         if not output_path:
-            output_path = self.config.get('relatorio.nome_pdf', 'Motoboys_Nao_Escalados.pdf')
+            output_path = self.caminho_saida('pdf')
+        
+        # Importado aqui para que as saídas CSV/Parquet/JSON Lines não dependam do reportlab
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib import colors
         
         try:
             doc = SimpleDocTemplate(output_path, pagesize=A4)
@@ -323,7 +1213,7 @@ class RelatorioGenerator:
             )
             
             # Título principal
-            title = Paragraph("Relatório de Motoboys Disponíveis", title_style)
+            title = Paragraph(titulo or "Relatório de Motoboys Disponíveis", title_style)
             story.append(title)
             story.append(Spacer(1, 20))
             
@@ -340,7 +1230,7 @@ class RelatorioGenerator:
                 
                 # Preparar dados para tabela
                 headers = [col.title() for col in df.columns]
-                data = [headers] + df.values.tolist()
+                data = [headers] + df.astype(object).where(df.notna(), '').values.tolist()
                 
                 # Criar tabela
                 table = Table(data)
@@ -360,6 +1250,25 @@ class RelatorioGenerator:
                 story.append(table)
                 story.append(Spacer(1, 30))
             
+            # Padrões por dia da semana
+            if padroes is not None:
+                inicio, fim = padroes.attrs.get('periodo', (None, None))
+                periodo = f" ({inicio:%d/%m/%Y} a {fim:%d/%m/%Y})" if inicio and fim else ""
+                story.append(Paragraph(f"Padrões por Dia da Semana{periodo}", date_style))
+                
+                headers = ['Nome'] + DIAS_SEMANA + ['Dias', 'Utilização (%)']
+                table = Table([headers] + padroes.astype(object).where(padroes.notna(), '').values.tolist())
+                table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, -1), 9),
+                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+                ]))
+                story.append(table)
+            
             # Gerar PDF
             doc.build(story)
             logger.info(f"Relatório PDF gerado: {output_path}")
@@ -368,13 +1277,225 @@ class RelatorioGenerator:
         except Exception as e:
             logger.error(f"Erro ao gerar PDF: {e}")
             raise
+    
+    def gerar_relatorios_particionados(self, particoes: Dict[str, Dict[str, pd.DataFrame]],
+                                       modo: str = None, formatos: List[str] = None,
+                                       paralelo: bool = True) -> List[str]:
+        """Gera relatórios por região, renderizando as partições em paralelo
+        
+        Com 'paralelo' falso, renderiza tudo na thread atual (usado no processamento em
+        lote, que já roda os perfis em threads e não deve criar um pool por thread).
+        """
+        modo = modo or self.config.get('particao.modo', 'arquivos')
+        formatos = formatos or self.config.get('relatorio.formatos', ['excel', 'pdf'])
+        for formato in formatos:
+            self._formato(formato)
+        
+        if modo == 'arquivos':
+            # Um arquivo por partição e formato
+            tarefas = [
+                (formato, dados, self._caminho_particao(self.caminho_saida(formato), particao))
+                for particao, dados in particoes.items()
+                for formato in formatos
+            ]
+        elif modo == 'abas':
+            # Um único arquivo por formato, com uma aba (ou seção) por partição e data
+            rotulados = {
+                f"{data_str} - {particao}": df
+                for particao, dados_particao in particoes.items()
+                for data_str, df in dados_particao.items()
+            }
+            tarefas = []
+            for formato in formatos:
+                if formato in ('excel', 'pdf'):
+                    dados = rotulados
+                else:
+                    # Saídas tabulares levam a região como coluna
+                    dados = self._juntar_particoes(particoes)
+                tarefas.append((formato, dados, self.caminho_saida(formato)))
+        else:
+            raise ValueError(f"Modo de partição inválido: {modo}")
+        
+        if len(tarefas) <= 1 or not paralelo:
+            return [_gerar_relatorio_tarefa(self.config, *tarefa) for tarefa in tarefas]
+        
+        max_workers = self.config.get('particao.max_workers', 4)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = [executor.submit(_gerar_relatorio_tarefa, self.config, *tarefa) for tarefa in tarefas]
+            caminhos = [futuro.result() for futuro in futuros]
+        
+        logger.info(f"Relatórios particionados gerados: {len(caminhos)} arquivos")
+        return caminhos
+    
+    def _juntar_particoes(self, particoes: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+        """Junta as partições por data, com a região em uma coluna"""
+        por_data = {}
+        for particao, dados_particao in particoes.items():
+            for data_str, df in dados_particao.items():
+                por_data.setdefault(data_str, []).append(df.assign(regiao=particao))
+        return {data_str: pd.concat(dfs) for data_str, dfs in por_data.items()}
+    
+    def _caminho_particao(self, output_path: str, particao: str) -> str:
+        """Monta o nome do arquivo de uma partição a partir do nome base"""
+        base, extensao = os.path.splitext(output_path)
+        sufixo = re.sub(r'[^\w-]+', '_', str(particao)).strip('_') or 'Sem_Regiao'
+        return f"{base}_{sufixo}{extensao}"
+    
+    def _nome_aba(self, texto: str, usadas: set) -> str:
+        """Gera um nome de aba válido para o Excel (máx. 31 caracteres, sem repetição)"""
+        nome = re.sub(r'[\[\]:*?/\\]', '_', texto)[:31]
+        candidato = nome
+        contador = 2
+        while candidato.lower() in usadas:
+            sufixo = f"~{contador}"
+            candidato = nome[:31 - len(sufixo)] + sufixo
+            contador += 1
+        usadas.add(candidato.lower())
+        return candidato
+
+def _gerar_relatorio_tarefa(config: ConfigManager, formato: str,
+                            dados_por_data: Dict[str, pd.DataFrame], output_path: str) -> str:
+    """Gera um relatório em um processo separado"""
+    generator = RelatorioGenerator(config)
+    metodo, _, _ = generator._formato(formato)
+    return getattr(generator, metodo)(dados_por_data, output_path)
+
+def gerar_relatorios_para_datas(config: ConfigManager, data_processor: DataProcessor, datas: List[str],
+                                formatos: List[str] = None, ranking_carga: bool = False,
+                                paralelo: bool = True) -> List[str]:
+    """Calcula a disponibilidade nas datas e gera os relatórios configurados (por região, se houver)"""
+    relatorio_generator = RelatorioGenerator(config)
+    
+    if ranking_carga:
+        nao_agendados_por_data = data_processor.obter_ranking_carga(datas)
+    else:
+        nao_agendados_por_data = data_processor.obter_motoboys_disponiveis(datas)
+    if not nao_agendados_por_data:
+        return []
+    
+    if config.get('particao.coluna'):
+        particoes = data_processor.particionar_disponiveis(nao_agendados_por_data)
+        return relatorio_generator.gerar_relatorios_particionados(particoes, formatos=formatos, paralelo=paralelo)
+    padroes = data_processor.padroes_semana() if config.get('padroes_semana.exportar') else None
+    return list(relatorio_generator.gerar_relatorios(nao_agendados_por_data, formatos, padroes=padroes).values())
+
+class ProcessadorLote:
+    """Processa vários perfis de configuração (ex.: uma loja por perfil) em paralelo
+    
+    Perfis que usam a mesma planilha de cadastro compartilham uma única cópia já
+    normalizada (CacheCadastro). Sem 'relatorio.diretorio_saida' no perfil, os
+    relatórios vão para uma pasta com o caminho do perfil sem a extensão (ex.:
+    lojaA/config.json -> lojaA/config/). Caminhos relativos no perfil (planilhas,
+    pasta de saída e de snapshot) são relativos à pasta do arquivo de perfil.
+    Perfis que gerariam os mesmos arquivos não são processados.
+    """
+    
+    # Caminhos do perfil resolvidos a partir da pasta do arquivo de perfil
+    CAMINHOS_PERFIL = [
+        'arquivos.cadastro',
+        'arquivos.agendamento',
+        'arquivos.ausencias',
+        'relatorio.diretorio_saida',
+        'snapshot.diretorio',
+    ]
+    
+    def __init__(self, perfis: List[str], max_workers: int = 4, coluna_particao: str = None):
+        self.perfis = perfis
+        self.max_workers = max_workers
+        self.coluna_particao = coluna_particao
+        self.cache_cadastro = CacheCadastro()
+    
+    def executar(self, datas: List[str], formatos: List[str] = None,
+                 ranking_carga: bool = False) -> Dict[str, object]:
+        """Executa todos os perfis; retorna os arquivos gerados (ou a exceção) por perfil"""
+        resultados = {}
+        configs = {}
+        for perfil in self.perfis:
+            try:
+                configs[perfil] = self._carregar_perfil(perfil)
+            except Exception as e:
+                logger.error(f"Erro ao processar perfil {perfil}: {e}")
+                resultados[perfil] = e
+        
+        # Dois perfis escrevendo os mesmos arquivos ao mesmo tempo sobrescreveriam um ao outro
+        for perfil, conflitos in self._saidas_em_conflito(configs, formatos).items():
+            erro = ValueError(f"Os relatórios do perfil {perfil} seriam gravados nos mesmos arquivos "
+                              f"que os de {', '.join(conflitos)}; configure relatorio.diretorio_saida")
+            logger.error(f"Erro ao processar perfil {perfil}: {erro}")
+            resultados[perfil] = erro
+            del configs[perfil]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futuros = {
+                perfil: executor.submit(self._processar_perfil, perfil, config, datas, formatos, ranking_carga)
+                for perfil, config in configs.items()
+            }
+            for perfil, futuro in futuros.items():
+                try:
+                    resultados[perfil] = futuro.result()
+                except Exception as e:
+                    logger.error(f"Erro ao processar perfil {perfil}: {e}")
+                    resultados[perfil] = e
+        
+        return {perfil: resultados[perfil] for perfil in self.perfis}
+    
+    def _carregar_perfil(self, perfil: str) -> ConfigManager:
+        """Lê a configuração de um perfil, com a pasta de saída padrão do lote"""
+        if not os.path.exists(perfil):
+            raise FileNotFoundError(f"Arquivo de perfil não encontrado: {perfil}")
+        
+        config = ConfigManager(perfil, estrito=True)
+        pasta_perfil = Path(perfil).parent
+        for chave in self.CAMINHOS_PERFIL:
+            caminho = config.get(chave)
+            if caminho and not os.path.isabs(caminho):
+                secao, nome = chave.split('.')
+                config.config[secao][nome] = str(pasta_perfil / caminho)
+        if not config.get('relatorio.diretorio_saida'):
+            config.config['relatorio']['diretorio_saida'] = str(Path(perfil).with_suffix(''))
+        if self.coluna_particao:
+            config.config['particao']['coluna'] = self.coluna_particao
+        return config
+    
+    def _saidas_em_conflito(self, configs: Dict[str, ConfigManager],
+                            formatos: List[str] = None) -> Dict[str, List[str]]:
+        """Perfis cujos arquivos de saída coincidem com os de outro perfil"""
+        donos = {}
+        for perfil, config in configs.items():
+            nomes = {
+                config.get(chave, padrao)
+                for formato, (_, chave, padrao) in RelatorioGenerator.FORMATOS.items()
+                if formato in (formatos or config.get('relatorio.formatos', ['excel', 'pdf']))
+            }
+            diretorio = os.path.abspath(config.get('relatorio.diretorio_saida'))
+            for nome in nomes:
+                donos.setdefault(os.path.join(diretorio, nome), []).append(perfil)
+        
+        conflitos = {}
+        for perfis in donos.values():
+            for perfil in perfis:
+                outros = [outro for outro in perfis if outro != perfil]
+                if outros:
+                    conflitos.setdefault(perfil, [])
+                    conflitos[perfil].extend(outro for outro in outros if outro not in conflitos[perfil])
+        return conflitos
+    
+    def _processar_perfil(self, perfil: str, config: ConfigManager, datas: List[str],
+                          formatos: List[str] = None, ranking_carga: bool = False) -> List[str]:
+        """Carrega os dados de um perfil e gera seus relatórios"""
+        logger.info(f"Processando perfil: {perfil}")
+        data_processor = DataProcessor(config, self.cache_cadastro)
+        data_processor.carregar_dados()
+        # Os perfis já rodam em paralelo; as partições são geradas na própria thread
+        return gerar_relatorios_para_datas(config, data_processor, datas, formatos, ranking_carga,
+                                           paralelo=False)
 
 class DisponibilidadeApp:
     """Aplicação principal com interface gráfica"""
     
-    def __init__(self, root):
+    def __init__(self, root, config_file: str = "config.json"):
         self.root = root
-        self.config = ConfigManager()
+        self.config = ConfigManager(config_file)
         self.data_processor = DataProcessor(self.config)
         self.relatorio_generator = RelatorioGenerator(self.config)
         
@@ -385,12 +1506,13 @@ class DisponibilidadeApp:
         self.datas_selecionadas = []
         self.cadastro_path = None
         self.agendamento_path = None
+        self.carregando = False
         
         # Criar interface
         self._criar_interface()
         
-        # Tentar carregar dados automaticamente
-        self._tentar_carregar_dados_automatico()
+        # Tentar carregar dados automaticamente (em segundo plano, após a janela aparecer)
+        self.root.after_idle(self._tentar_carregar_dados_automatico)
     
     def _configurar_janela(self):
         """Configura a janela principal"""
@@ -434,15 +1556,17 @@ class DisponibilidadeApp:
         ttk.Label(arquivos_frame, text="Cadastro:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
         self.cadastro_label = ttk.Label(arquivos_frame, text="Não selecionado", foreground="red")
         self.cadastro_label.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
-        ttk.Button(arquivos_frame, text="Selecionar", 
-                  command=self._selecionar_cadastro).grid(row=0, column=2)
+        self.btn_cadastro = ttk.Button(arquivos_frame, text="Selecionar", 
+                                       command=self._selecionar_cadastro)
+        self.btn_cadastro.grid(row=0, column=2)
         
         # Agendamento
         ttk.Label(arquivos_frame, text="Agendamento:").grid(row=1, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         self.agendamento_label = ttk.Label(arquivos_frame, text="Não selecionado", foreground="red")
         self.agendamento_label.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(0, 5), pady=(5, 0))
-        ttk.Button(arquivos_frame, text="Selecionar", 
-                  command=self._selecionar_agendamento).grid(row=1, column=2, pady=(5, 0))
+        self.btn_agendamento = ttk.Button(arquivos_frame, text="Selecionar", 
+                                          command=self._selecionar_agendamento)
+        self.btn_agendamento.grid(row=1, column=2, pady=(5, 0))
         
         # Frame do calendário
         cal_frame = ttk.LabelFrame(main_frame, text="Calendário (Duplo clique para adicionar)", padding="10")
@@ -482,14 +1606,38 @@ class DisponibilidadeApp:
         acao_frame = ttk.Frame(main_frame)
         acao_frame.grid(row=3, column=0, columnspan=3, pady=(20, 0))
         
-        ttk.Button(acao_frame, text="Gerar Relatórios", 
-                  command=self._gerar_relatorios, 
-                  style='Accent.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        self.btn_gerar = ttk.Button(acao_frame, text="Gerar Relatórios", 
+                                    command=self._gerar_relatorios, 
+                                    style='Accent.TButton')
+        self.btn_gerar.pack(side=tk.LEFT, padx=(0, 10))
+        self.btn_mudancas = ttk.Button(acao_frame, text="Gerar Mudanças", 
+                                       command=self._gerar_mudancas)
+        self.btn_mudancas.pack(side=tk.LEFT, padx=(0, 10))
+        self.btn_escala = ttk.Button(acao_frame, text="Escala por Demanda", 
+                                     command=self._gerar_escala)
+        self.btn_escala.pack(side=tk.LEFT, padx=(0, 10))
+        self.btn_proximos = ttk.Button(acao_frame, text="Motoboys Próximos", 
+                                       command=self._buscar_proximos)
+        self.btn_proximos.pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(acao_frame, text="Configurações", 
                   command=self._abrir_configuracoes).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(acao_frame, text="Sair", 
                   command=self.root.destroy).pack(side=tk.LEFT)
         
+        # Barra de status
+        status_frame = ttk.Frame(main_frame)
+        status_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        status_frame.columnconfigure(0, weight=1)
+        
+        self.status_label = ttk.Label(status_frame, text="Pronto", anchor=tk.W)
+        self.status_label.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.progresso_bar = ttk.Progressbar(status_frame, mode='determinate', maximum=100, length=200)
+        self.progresso_bar.grid(row=0, column=1, sticky=tk.E)
+        
+        # Ações que dependem dos dados (desabilitadas durante o carregamento)
+        self.botoes_dados = [self.btn_cadastro, self.btn_agendamento, self.btn_gerar, self.btn_mudancas,
+                             self.btn_escala, self.btn_proximos]
+        
         # Configurar grid weights
         main_frame.rowconfigure(2, weight=1)
         cal_frame.rowconfigure(0, weight=1)
@@ -502,14 +1650,67 @@ class DisponibilidadeApp:
         agendamento_path = self.config.get('arquivos.agendamento')
         
         if os.path.exists(cadastro_path) and os.path.exists(agendamento_path):
+            self.cadastro_path = cadastro_path
+            self.agendamento_path = agendamento_path
+            self._atualizar_labels_arquivos()
+            self._carregar_dados_em_segundo_plano()
+    
+    def _carregar_dados_em_segundo_plano(self, ao_concluir: Callable[[], None] = None):
+        """Carrega os dados em uma thread, mantendo a interface responsiva"""
+        self._definir_carregando(True)
+        eventos = queue.Queue()
+        cadastro_path, agendamento_path = self.cadastro_path, self.agendamento_path
+        
+        def carregar():
             try:
-                self.cadastro_path = cadastro_path
-                self.agendamento_path = agendamento_path
-                self._atualizar_labels_arquivos()
-                self.data_processor.carregar_dados(cadastro_path, agendamento_path)
-                messagebox.showinfo("Sucesso", "Dados carregados automaticamente!")
+                self.data_processor.carregar_dados(
+                    cadastro_path, agendamento_path,
+                    progresso=lambda mensagem, percentual: eventos.put(('progresso', mensagem, percentual))
+                )
+                eventos.put(('concluido',))
             except Exception as e:
-                messagebox.showwarning("Aviso", f"Erro ao carregar dados automaticamente: {e}")
+                eventos.put(('erro', e))
+        
+        threading.Thread(target=carregar, daemon=True).start()
+        self._acompanhar_carregamento(eventos, ao_concluir)
+    
+    def _acompanhar_carregamento(self, eventos: queue.Queue, ao_concluir: Callable[[], None] = None):
+        """Atualiza a barra de status com os eventos da thread de carregamento (executa na thread da interface)"""
+        try:
+            while True:
+                evento = eventos.get_nowait()
+                if evento[0] == 'progresso':
+                    _, mensagem, percentual = evento
+                    self._atualizar_status(mensagem, percentual)
+                elif evento[0] == 'concluido':
+                    self._definir_carregando(False)
+                    self._atualizar_status(
+                        f"Dados carregados: {len(self.data_processor.cadastro_df)} motoboys, "
+                        f"{len(self.data_processor.agendamento_df)} agendamentos", 100)
+                    if ao_concluir:
+                        ao_concluir()
+                    return
+                else:
+                    self._definir_carregando(False)
+                    self._atualizar_status(f"Erro ao carregar dados: {evento[1]}", 0, erro=True)
+                    if ao_concluir:
+                        messagebox.showerror("Erro", f"Erro ao carregar dados: {evento[1]}")
+                    return
+        except queue.Empty:
+            self.root.after(100, self._acompanhar_carregamento, eventos, ao_concluir)
+    
+    def _definir_carregando(self, carregando: bool):
+        """Habilita/desabilita as ações que dependem dos dados"""
+        self.carregando = carregando
+        estado = tk.DISABLED if carregando else tk.NORMAL
+        for botao in self.botoes_dados:
+            botao.config(state=estado)
+    
+    def _atualizar_status(self, mensagem: str, percentual: int = None, erro: bool = False):
+        """Atualiza a barra de status"""
+        self.status_label.config(text=mensagem, foreground="red" if erro else "")
+        if percentual is not None:
+            self.progresso_bar['value'] = percentual
     
     def _selecionar_cadastro(self):
         """Seleciona arquivo de cadastro"""
@@ -573,54 +1774,160 @@ class DisponibilidadeApp:
         for data in self.datas_selecionadas:
             self.lista_datas.insert(tk.END, data)
     
-    def _gerar_relatorios(self):
-        """Gera os relatórios Excel e PDF"""
+    def _dados_prontos(self, ao_concluir: Callable[[], None]) -> bool:
+        """Valida a seleção e garante os dados carregados antes de uma ação
+        
+        Se for preciso (re)carregar as planilhas, o carregamento é feito em segundo
+        plano e 'ao_concluir' é chamado ao final; nesse caso retorna False.
+        """
         # Verificar se arquivos foram selecionados
         if not self.cadastro_path or not self.agendamento_path:
             messagebox.showerror("Erro", "Selecione os arquivos de cadastro e agendamento!")
-            return
+            return False
         
         if not self.datas_selecionadas:
             messagebox.showwarning("Aviso", "Selecione pelo menos uma data!")
+            return False
+        
+        # Carregar dados em segundo plano se os arquivos mudaram desde o último carregamento
+        if not self.data_processor.dados_atualizados(self.cadastro_path, self.agendamento_path):
+            self._carregar_dados_em_segundo_plano(ao_concluir=ao_concluir)
+            return False
+        
+        return True
+    
+    def _gerar_relatorios(self):
+        """Gera os relatórios Excel e PDF"""
+        if not self._dados_prontos(ao_concluir=self._gerar_relatorios):
             return
         
         try:
-            # Carregar dados
-            self.data_processor.carregar_dados(self.cadastro_path, self.agendamento_path)
-            
-            # Processar dados para as datas selecionadas
-            nao_agendados_por_data = self.data_processor.obter_motoboys_disponiveis(self.datas_selecionadas)
+            # Mesmo caminho da linha de comando (relatórios por região e padrões semanais, se configurados)
+            caminhos = gerar_relatorios_para_datas(self.config, self.data_processor, self.datas_selecionadas)
             
-            if not nao_agendados_por_data:
+            if not caminhos:
                 messagebox.showinfo("Informação", "Não há motoboys disponíveis nas datas selecionadas!")
                 return
             
-            # Gerar relatórios
-            excel_path = self.relatorio_generator.gerar_excel(nao_agendados_por_data)
-            pdf_path = self.relatorio_generator.gerar_pdf(nao_agendados_por_data)
-            
+            if len(caminhos) > 10:
+                arquivos = f"Arquivos gerados: {len(caminhos)}"
+            else:
+                arquivos = "\n".join(os.path.basename(caminho) for caminho in caminhos)
             messagebox.showinfo("Sucesso", 
-                              f"Relatórios gerados com sucesso!\n\n"
-                              f"Excel: {os.path.basename(excel_path)}\n"
-                              f"PDF: {os.path.basename(pdf_path)}")
+                              f"Relatórios gerados com sucesso!\n\n{arquivos}")
             
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao gerar relatórios: {str(e)}")
             logger.error(f"Erro ao gerar relatórios: {e}")
     
+    def _gerar_mudancas(self):
+        """Gera o relatório de mudanças desde a última execução"""
+        if not self._dados_prontos(ao_concluir=self._gerar_mudancas):
+            return
+        
+        try:
+            mudancas_por_data = self.data_processor.calcular_mudancas(self.datas_selecionadas, salvar_estado=False)
+            
+            if not mudancas_por_data:
+                self.data_processor.confirmar_mudancas()
+                messagebox.showinfo("Informação", "Nenhuma mudança desde o último relatório de mudanças!")
+                return
+            
+            caminhos = self.relatorio_generator.gerar_relatorios(
+                mudancas_por_data,
+                nome_base=self.config.get('mudancas.nome_base', 'Mudancas_Disponibilidade'),
+                titulo="Mudanças na Disponibilidade de Motoboys"
+            )
+            # Só depois dos relatórios gerados, para não perder as mudanças se a geração falhar
+            self.data_processor.confirmar_mudancas()
+            
+            arquivos = "\n".join(f"{formato.upper()}: {os.path.basename(caminho)}"
+                                 for formato, caminho in caminhos.items())
+            messagebox.showinfo("Sucesso",
+                              f"Mudanças encontradas em {len(mudancas_por_data)} datas!\n\n{arquivos}")
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao gerar mudanças: {str(e)}")
+            logger.error(f"Erro ao gerar mudanças: {e}")
+    
+    def _gerar_escala(self):
+        """Aloca os motoboys disponíveis à demanda por bairro das datas selecionadas"""
+        if not self._dados_prontos(ao_concluir=self._gerar_escala):
+            return
+        
+        demanda_path = self.config.get('alocacao.arquivo_demanda')
+        if not demanda_path or not os.path.exists(demanda_path):
+            demanda_path = filedialog.askopenfilename(
+                title="Selecione a planilha de DEMANDA (data, bairro, quantidade)",
+                filetypes=[('Planilhas', '*.xlsx *.xls *.csv'), ('Todos os arquivos', '*.*')]
+            )
+            if not demanda_path:
+                return
+        
+        try:
+            alocador = AlocadorMotoboys(self.config)
+            demanda = alocador.carregar_demanda(demanda_path)
+            demanda = demanda[demanda['data'].isin(self.datas_selecionadas)]
+            if demanda.empty:
+                messagebox.showinfo("Informação", "Não há demanda nas datas selecionadas!")
+                return
+            
+            disponiveis_por_data = self.data_processor.obter_motoboys_disponiveis(self.datas_selecionadas)
+            escala_por_data = alocador.alocar(disponiveis_por_data, demanda, self.data_processor.cadastro_df)
+            caminhos = self.relatorio_generator.gerar_relatorios(
+                escala_por_data,
+                nome_base=self.config.get('alocacao.nome_base', 'Escala_Motoboys'),
+                titulo="Escala de Motoboys por Demanda"
+            )
+            
+            faltantes = sum(int(escala['nome'].isna().sum()) for escala in escala_por_data.values())
+            aviso = f"\n\nAtenção: faltaram {faltantes} motoboys para cobrir a demanda." if faltantes else ""
+            arquivos = "\n".join(f"{formato.upper()}: {os.path.basename(caminho)}"
+                                 for formato, caminho in caminhos.items())
+            messagebox.showinfo("Sucesso", f"Escala gerada com sucesso!\n\n{arquivos}{aviso}")
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao gerar escala: {str(e)}")
+            logger.error(f"Erro ao gerar escala: {e}")
+    
+    def _buscar_proximos(self, cep: str = None):
+        """Mostra os motoboys disponíveis mais próximos de um CEP nas datas selecionadas"""
+        if cep is None:
+            cep = simpledialog.askstring("Motoboys Próximos", "CEP de referência:", parent=self.root)
+            if not cep:
+                return
+        if not self._dados_prontos(ao_concluir=lambda: self._buscar_proximos(cep)):
+            return
+        
+        try:
+            k = self.config.get('proximidade.top_k', 5)
+            linhas = []
+            for data_str in self.datas_selecionadas:
+                proximos = self.data_processor.motoboys_proximos(data_str, cep, k)
+                linhas.append(f"{data_str}:")
+                linhas.extend(f"  {linha.nome} - CEP {linha.cep}" for linha in proximos.itertuples(index=False))
+                if proximos.empty:
+                    linhas.append("  nenhum motoboy disponível")
+            messagebox.showinfo("Motoboys Próximos", f"Mais próximos do CEP {cep}:\n\n" + "\n".join(linhas))
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao buscar motoboys próximos: {str(e)}")
+            logger.error(f"Erro ao buscar motoboys próximos: {e}")
+    
     def _abrir_configuracoes(self):
         """Abre janela de configurações"""
         # Implementar janela de configurações se necessário
         messagebox.showinfo("Configurações", "Funcionalidade de configurações em desenvolvimento.")
 
-def verificar_dependencias():
+def verificar_dependencias(dependencias: List[Tuple[str, str]] = None):
     """Verifica se todas as dependências estão instaladas"""
-    dependencias = [
-        ('pandas', 'pandas'),
-        ('tkcalendar', 'tkcalendar'),
-        ('reportlab', 'reportlab'),
-        ('openpyxl', 'openpyxl')
-    ]
+    if dependencias is None:
+        dependencias = [
+            ('pandas', 'pandas'),
+            ('tkcalendar', 'tkcalendar'),
+            ('reportlab', 'reportlab'),
+            ('openpyxl', 'openpyxl')
+        ]
     
     faltando = []
     for nome, modulo in dependencias:
@@ -639,11 +1946,158 @@ def verificar_dependencias():
     
     return True
 
-def main():
+def criar_parser() -> argparse.ArgumentParser:
+    """Cria o parser de argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Sistema de Disponibilidade de Motoboys. "
+                    "Sem --datas, abre a interface gráfica."
+    )
+    parser.add_argument('--config', default='config.json', help="Arquivo de configuração (padrão: config.json)")
+    parser.add_argument('--cadastro', help="Planilha de cadastro dos motoboys")
+    parser.add_argument('--agendamento', help="Planilha de agendamento")
+    parser.add_argument('--ausencias', help="Planilha de folgas e afastamentos (nome, início, fim)")
+    parser.add_argument('--datas', nargs='+', metavar='DD/MM/AAAA',
+                        help="Datas a analisar; executa sem interface gráfica")
+    parser.add_argument('--formatos', nargs='+', choices=list(RelatorioGenerator.FORMATOS),
+                        help="Formatos de saída (padrão: relatorio.formatos da configuração)")
+    parser.add_argument('--particionar-por', metavar='COLUNA',
+                        help="Gera um relatório por região (cidade, bairro ou cep)")
+    parser.add_argument('--perfis', nargs='+', metavar='CONFIG',
+                        help="Processa vários arquivos de configuração (lojas) em lote; requer --datas")
+    parser.add_argument('--mudancas', action='store_true',
+                        help="Gera apenas as mudanças de disponibilidade desde a última execução com --mudancas")
+    parser.add_argument('--demanda', metavar='ARQUIVO',
+                        help="Aloca os disponíveis à demanda (data, bairro, quantidade) do arquivo; "
+                             "sem --datas, usa as datas da demanda")
+    parser.add_argument('--ranking-carga', action='store_true',
+                        help="Lista todos os motoboys ordenados pela quantidade de pedidos no dia")
+    parser.add_argument('--cep', help="Lista os motoboys disponíveis mais próximos deste CEP; requer --datas")
+    parser.add_argument('--top', type=int, metavar='K',
+                        help="Quantidade de motoboys na busca por CEP (padrão: proximidade.top_k da configuração)")
+    return parser
+
+def executar_cli(args: argparse.Namespace) -> int:
+    """Executa a análise sem interface gráfica"""
+    config = ConfigManager(args.config)
+    if args.particionar_por:
+        config.config['particao']['coluna'] = args.particionar_por
+    if args.ausencias:
+        config.config['arquivos']['ausencias'] = args.ausencias
+    formatos = args.formatos or config.get('relatorio.formatos', ['excel', 'pdf'])
+    
+    # Só exige as bibliotecas dos formatos pedidos
+    dependencias = [('pandas', 'pandas'), ('openpyxl', 'openpyxl')]
+    if 'pdf' in formatos:
+        dependencias.append(('reportlab', 'reportlab'))
+    if 'parquet' in formatos:
+        dependencias.append(('pyarrow', 'pyarrow'))
+    if not verificar_dependencias(dependencias):
+        return 1
+    
+    # Vários perfis (lojas) em lote
+    if args.perfis:
+        lote = ProcessadorLote(args.perfis, coluna_particao=args.particionar_por)
+        resultados = lote.executar(args.datas, formatos=args.formatos, ranking_carga=args.ranking_carga)
+        for perfil, resultado in resultados.items():
+            if isinstance(resultado, Exception):
+                print(f"❌ {perfil}: {resultado}")
+            else:
+                print(f"✅ {perfil}: {len(resultado)} relatórios gerados")
+                for caminho in resultado:
+                    print(f"   - {caminho}")
+        return 1 if any(isinstance(r, Exception) for r in resultados.values()) else 0
+    
+    try:
+        data_processor = DataProcessor(config)
+        data_processor.carregar_dados(args.cadastro, args.agendamento)
+        
+        if args.cep:
+            k = args.top or config.get('proximidade.top_k', 5)
+            for data_str in args.datas:
+                proximos = data_processor.motoboys_proximos(data_str, args.cep, k)
+                print(f"📍 {data_str} - {len(proximos)} motoboys disponíveis mais próximos do CEP {args.cep}:")
+                for linha in proximos.itertuples(index=False):
+                    print(f"   - {linha.nome} (CEP {linha.cep}, distância {linha.distancia_cep})")
+            return 0
+        
+        if args.demanda:
+            alocador = AlocadorMotoboys(config)
+            demanda = alocador.carregar_demanda(args.demanda)
+            datas = args.datas or demanda['data'].unique().tolist()
+            demanda = demanda[demanda['data'].isin(datas)]
+            escala_por_data = alocador.alocar(
+                data_processor.obter_motoboys_disponiveis(datas), demanda, data_processor.cadastro_df
+            )
+            if not escala_por_data:
+                print("ℹ️  Nenhuma demanda nas datas selecionadas")
+                return 0
+            caminhos = RelatorioGenerator(config).gerar_relatorios(
+                escala_por_data, formatos,
+                nome_base=config.get('alocacao.nome_base', 'Escala_Motoboys'),
+                titulo="Escala de Motoboys por Demanda"
+            )
+            print(f"✅ Escala gerada para {len(escala_por_data)} datas:")
+            for caminho in caminhos.values():
+                print(f"   - {caminho}")
+            return 0
+        
+        if args.mudancas:
+            mudancas_por_data = data_processor.calcular_mudancas(args.datas, salvar_estado=False)
+            if not mudancas_por_data:
+                data_processor.confirmar_mudancas()
+                print("ℹ️  Nenhuma mudança desde a última execução")
+                return 0
+            caminhos = RelatorioGenerator(config).gerar_relatorios(
+                mudancas_por_data, formatos,
+                nome_base=config.get('mudancas.nome_base', 'Mudancas_Disponibilidade'),
+                titulo="Mudanças na Disponibilidade de Motoboys"
+            )
+            # Só depois dos relatórios gerados, para não perder as mudanças se a geração falhar
+            data_processor.confirmar_mudancas()
+            print(f"✅ Mudanças encontradas em {len(mudancas_por_data)} datas:")
+            for caminho in caminhos.values():
+                print(f"   - {caminho}")
+            return 0
+        
+        caminhos = gerar_relatorios_para_datas(config, data_processor, args.datas, formatos, args.ranking_carga)
+        if not caminhos:
+            print("ℹ️  Não há motoboys disponíveis nas datas selecionadas")
+            return 0
+        
+        print("✅ Relatórios gerados:")
+        for caminho in caminhos:
+            print(f"   - {caminho}")
+        return 0
+        
+    except Exception as e:
+        logger.error(f"Erro na execução via linha de comando: {e}")
+        print(f"❌ Erro: {e}")
+        return 1
+
+def main(argv: List[str] = None):
     """Função principal"""
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.perfis and not args.datas:
+        parser.error("--perfis requer --datas")
+    if args.perfis and args.mudancas:
+        parser.error("--mudancas não pode ser usado com --perfis")
+    if args.perfis and args.demanda:
+        parser.error("--demanda não pode ser usado com --perfis")
+    if args.perfis and args.ausencias:
+        parser.error("--ausencias não pode ser usado com --perfis (configure arquivos.ausencias em cada perfil)")
+    if args.cep and not args.datas:
+        parser.error("--cep requer --datas")
+    if args.cep and args.perfis:
+        parser.error("--cep não pode ser usado com --perfis")
+    
     print("🚚 Sistema de Disponibilidade de Motoboys v2.0")
     print("=" * 50)
     
+    # Modo linha de comando
+    if args.datas or args.demanda:
+        sys.exit(executar_cli(args))
+    
     # Verificar dependências
     if not verificar_dependencias():
         input("\nPressione Enter para sair...")
@@ -661,7 +2115,7 @@ def main():
     try:
         # Criar aplicação
         root = tk.Tk()
-        app = DisponibilidadeApp(root)
+        app = DisponibilidadeApp(root, args.config)
         
         # Centralizar janela
         root.update_idletasks()